@@ -0,0 +1,166 @@
+"""
+Micro-benchmarks for the per-frame camera pipeline
+Measures per-frame cost of processing stages on a synthetic 1920x1080 frame
+(no camera required)
+
+Usage:
+    python benchmark_frame_pipeline.py
+"""
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from src.camera_manager import CameraManager
+
+
+def measure(func, iterations: int = 500) -> float:
+    """
+    Measure average call time
+    
+    Args:
+        func: Function to call with no arguments
+        iterations: Number of timed calls
+    
+    Returns:
+        Average time per call in microseconds
+    """
+    # Warm up (fills caches, first-time allocations)
+    for _ in range(10):
+        func()
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def legacy_add_timestamp(frame: np.ndarray, timestamp_format: str) -> np.ndarray:
+    """Original overlay: strftime + rectangle + anti-aliased putText every frame"""
+    timestamp = datetime.now().strftime(timestamp_format)
+    cv2.rectangle(frame, (10, 10), (350, 50), (0, 0, 0), -1)
+    cv2.putText(frame, timestamp, (20, 38), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+    return frame
+
+
+def benchmark_timestamp_overlay(manager: CameraManager, frame: np.ndarray):
+    """Compare legacy overlay drawing against the cached patch blit"""
+    timestamp_format = manager.camera_config['timestamp_format']
+    
+    legacy_us = measure(lambda: legacy_add_timestamp(frame, timestamp_format))
+    cached_us = measure(lambda: manager._add_timestamp(frame))
+    
+    # Both paths must produce the same pixels for the same text
+    expected = legacy_add_timestamp(frame.copy(), timestamp_format)
+    actual = manager._add_timestamp(frame.copy())
+    identical = np.array_equal(expected, actual)
+    
+    print("Timestamp overlay:")
+    print(f"  legacy (draw per frame): {legacy_us:8.1f} us/frame")
+    print(f"  cached (patch blit):     {cached_us:8.1f} us/frame")
+    print(f"  speedup: {legacy_us / cached_us:.1f}x, identical output: {identical}")
+
+
+def benchmark_image_adjustments(manager: CameraManager, frame: np.ndarray):
+    """Compare per-control passes (new array each) against one in-place pass"""
+    buffer = frame.copy()
+    
+    # Brightness only (compiled to a saturating in-place add)
+    manager.update_camera_setting('brightness', 70)
+    legacy_us = measure(lambda: cv2.convertScaleAbs(frame, alpha=1, beta=20))
+    current_us = measure(lambda: manager._apply_image_adjustments(buffer))
+    expected = cv2.convertScaleAbs(frame, alpha=1, beta=20)
+    identical = np.array_equal(expected, manager._apply_image_adjustments(frame.copy()))
+    
+    print("Brightness adjustment:")
+    print(f"  legacy (convertScaleAbs): {legacy_us:8.1f} us/frame")
+    print(f"  compiled (in place):      {current_us:8.1f} us/frame")
+    print(f"  speedup: {legacy_us / current_us:.1f}x, identical output: {identical}")
+    
+    # Brightness + contrast + gamma (one LUT pass instead of three)
+    manager.update_camera_setting('contrast', 60)
+    manager.update_camera_setting('gamma', 120)
+    
+    gamma_lut = np.clip(255.0 * np.power(np.arange(256) / 255.0, 1 / 1.2), 0, 255).astype(np.uint8)
+    
+    def legacy_chain():
+        # Contrast + brightness in one scale pass, then a separate gamma table
+        adjusted = cv2.convertScaleAbs(frame, alpha=1.2, beta=20 - 128 * 0.2)
+        return cv2.LUT(adjusted, gamma_lut)
+    
+    legacy_us = measure(legacy_chain, iterations=100)
+    current_us = measure(lambda: manager._apply_image_adjustments(buffer), iterations=100)
+    
+    print("Brightness + contrast + gamma:")
+    print(f"  chained passes:           {legacy_us:8.1f} us/frame")
+    print(f"  compiled LUT (in place):  {current_us:8.1f} us/frame")
+    
+    for setting, value in (('brightness', 50), ('contrast', 50), ('gamma', 100)):
+        manager.update_camera_setting(setting, value)
+
+
+def benchmark_preview(manager: CameraManager, frame: np.ndarray):
+    """Compare full-frame convert + PIL LANCZOS thumbnail against resize-first"""
+    from PIL import Image
+    
+    def legacy_preview():
+        flipped = cv2.flip(frame, 1)
+        img = Image.fromarray(cv2.cvtColor(flipped, cv2.COLOR_BGR2RGB))
+        img.thumbnail((640, 480), Image.Resampling.LANCZOS)
+        return img
+    
+    # Feed the manager's ring buffer directly (no camera needed)
+    manager._ring[0] = frame.copy()  # Recycled into the frame pool by _reset_ring
+    manager._latest_slot = 0
+    manager.flip_horizontal = True
+    rgb = np.empty((*manager._fit_preview_size(frame.shape[1], frame.shape[0])[::-1], 3), dtype=np.uint8)
+    
+    def fast_preview():
+        small = manager.get_preview_frame()
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
+    
+    legacy_us = measure(legacy_preview, iterations=50)
+    fast_us = measure(fast_preview, iterations=50)
+    
+    print("Preview downscale:")
+    print(f"  legacy (convert + LANCZOS thumbnail): {legacy_us:8.1f} us/frame")
+    print(f"  resize first ({manager.camera_config.get('preview_interpolation', 'area')}): {fast_us:8.1f} us/frame")
+    print(f"  speedup: {legacy_us / fast_us:.1f}x")
+    
+    manager._reset_ring()
+
+
+def benchmark_frame_pool(manager: CameraManager, frame: np.ndarray):
+    """Compare a fresh copy per queued frame against a pooled buffer"""
+    pool = manager.frame_pool
+    
+    def pooled_copy():
+        pool.release(pool.copy(frame))
+    
+    legacy_us = measure(lambda: frame.copy(), iterations=200)
+    pooled_us = measure(pooled_copy, iterations=200)
+    stats = pool.get_stats()
+    
+    print("Encoder queue copy:")
+    print(f"  new array per frame:      {legacy_us:8.1f} us/frame")
+    print(f"  pooled buffer:            {pooled_us:8.1f} us/frame")
+    print(f"  pool hits {stats['hits']}, misses {stats['misses']}")
+
+
+def main():
+    manager = CameraManager()
+    width = manager.camera_config['recording_width']
+    height = manager.camera_config['recording_height']
+    frame = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+    
+    print(f"Frame: {width}x{height}")
+    benchmark_timestamp_overlay(manager, frame)
+    benchmark_image_adjustments(manager, frame)
+    benchmark_preview(manager, frame)
+    benchmark_frame_pool(manager, frame)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Lemiex Record App - Main Entry Point
 Webcam recording application with barcode scanner integration
 """
 
+import multiprocessing
 import sys
 from pathlib import Path
 
@@ -33,4 +34,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Capture worker process is started with spawn; required for frozen builds
+    multiprocessing.freeze_support()
     main()
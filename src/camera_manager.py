@@ -5,13 +5,21 @@ Manages camera detection, preview, recording with timestamp overlay
 
 import cv2
 import numpy as np
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 import yaml
+import json
 import os
+import re
+import shutil
+import subprocess
 import threading
+import time
+from .frame_pool import FramePool
 from .logger import setup_logger
+from .video_encoder import AsyncEncoder, create_video_writer, find_ffmpeg, subprocess_flags
 
 # Suppress OpenCV warnings
 os.environ['OPENCV_VIDEOIO_PRIORITY_MSMF'] = '0'
@@ -20,9 +28,107 @@ os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
 logger = setup_logger("CameraManager")
 
 
+def list_video_devices(ffmpeg_path: Optional[str] = None) -> Optional[Dict[int, str]]:
+    """
+    Identify video capture devices without opening them
+    
+    Windows lists DirectShow devices through ffmpeg (same order as
+    cv2.CAP_DSHOW indices); Linux reads /sys/class/video4linux.
+    
+    Args:
+        ffmpeg_path: ffmpeg executable (Windows only)
+    
+    Returns:
+        Map of camera index to a stable device identifier (device path if
+        known, else name), or None if devices cannot be listed this way
+    """
+    if os.name == "nt":
+        if not ffmpeg_path:
+            return None
+        try:
+            result = subprocess.run(
+                [ffmpeg_path, "-hide_banner", "-list_devices", "true", "-f", "dshow", "-i", "dummy"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=10,
+                creationflags=subprocess_flags()
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug(f"Device listing failed: {e}")
+            return None
+        
+        devices: Dict[int, str] = {}
+        in_video = False
+        for line in result.stderr.decode('utf-8', errors='ignore').splitlines():
+            # Older ffmpeg prints video/audio sections, newer tags each device
+            if "DirectShow video devices" in line:
+                in_video = True
+                continue
+            if "DirectShow audio devices" in line:
+                in_video = False
+                continue
+            
+            alternative = re.search(r'Alternative name "(.+)"', line)
+            if alternative:
+                if in_video and devices:
+                    devices[len(devices) - 1] = alternative.group(1)
+                continue
+            
+            device = re.search(r'\] +"(.+)"(?: \((video|audio|none)\))?', line)
+            if device:
+                in_video = device.group(2) == "video" if device.group(2) else in_video
+                if in_video:
+                    devices[len(devices)] = device.group(1)
+        return devices
+    
+    sys_dir = Path("/sys/class/video4linux")
+    if not sys_dir.is_dir():
+        return None
+    
+    devices = {}
+    for node in sys_dir.glob("video*"):
+        try:
+            index = int(node.name[len("video"):])
+            name = (node / "name").read_text(encoding='utf-8', errors='ignore').strip()
+            location = os.path.realpath(node / "device")
+        except (ValueError, OSError):
+            continue
+        devices[index] = f"{name}@{location}"
+    return devices
+
+
 class CameraManager:
     """Manages webcam operations including preview and recording"""
     
+    # Top-left corner of the timestamp overlay in the frame
+    TIMESTAMP_ORIGIN = (10, 10)
+    
+    # Upper bound on time spent timing one capture format
+    CAPTURE_PROBE_SECONDS = 1.5
+    
+    # A later capture format must be this much faster to replace an earlier one
+    CAPTURE_FPS_MARGIN = 1.1
+    
+    # Assumed length of a recording without time limit (disk space check)
+    UNLIMITED_RECORDING_ESTIMATE = 600
+    
+    # Smallest ROI side as a fraction of the frame
+    MIN_ROI_SIZE = 0.1
+    
+    # File name prefix of standby writers (renamed once an order takes them over)
+    STANDBY_PREFIX = "_standby_"
+    
+    # Stopped recordings whose frame counters are kept for get_frame_stats()
+    MAX_PENDING_FRAME_STATS = 20
+    
+    # Config names for preview_interpolation
+    INTERPOLATIONS = {
+        'nearest': cv2.INTER_NEAREST,
+        'linear': cv2.INTER_LINEAR,
+        'area': cv2.INTER_AREA,
+        'cubic': cv2.INTER_CUBIC
+    }
+    
     def __init__(self, config_path: Optional[str] = None):
         """
         Initialize Camera Manager
@@ -41,15 +147,138 @@ class CameraManager:
         self.storage_config = self.config['storage']
         
         self.cap: Optional[cv2.VideoCapture] = None
-        self.writer: Optional[cv2.VideoWriter] = None
+        self.encoder: Optional[AsyncEncoder] = None
+        self._active_path: Optional[str] = None  # File the encoder is writing
+        self.current_output_path: Optional[str] = None  # Recording path (before segment suffix)
+        self.disk_space_low = False  # Last start_recording refused for lack of space
         self.is_recording = False
+        self.recording_timestamp: Optional[str] = None
         self.current_camera_index = self.camera_config['default_index']
         self._lock = threading.Lock()
         self._is_switching = False
         
+        # Negotiated capture format per camera index (probed once per device,
+        # kept across launches in capture_modes.json keyed by device)
+        self._capture_modes: Dict[int, dict] = {}
+        self.capture_mode: Optional[dict] = None
+        self.ffmpeg_path = find_ffmpeg(self.config.get('ffmpeg', {}).get('path', ''))
+        from .resource_path import get_app_dir
+        self._mode_cache_path = get_app_dir() / "capture_modes.json"
+        
+        # Camera enumeration cache (index -> display name) for incremental scans
+        self._camera_cache: Dict[int, str] = {}
+        # Device identifier last seen at each index (see list_video_devices)
+        self._camera_ids: Dict[int, str] = {}
+        # Devices held open by other managers (multi-camera); never probed
+        self.shared_cameras: Dict[int, "CameraManager"] = {}
+        # Devices held open in another process (index -> capture mode); never probed
+        self.external_cameras: Dict[int, dict] = {}
+        self._enumeration_lock = threading.Lock()
+        self._enumerating = False
+        
+        # Background capture thread state
+        # Frames are read at the camera's native rate into a small ring of
+        # preallocated buffers; readers only ever copy the newest slot.
+        self._capture_thread: Optional[threading.Thread] = None
+        self._capture_running = False
+        self._frame_lock = threading.Lock()
+        self._ring_size = max(2, int(self.camera_config.get('capture_buffer_size', 3)))
+        self._ring: List[Optional[np.ndarray]] = [None] * self._ring_size
+        self._ring_times: List[float] = [0.0] * self._ring_size
+        self._latest_slot = -1
+        self._frame_seq = 0
+        
+        # Fan-out: every processed frame goes to the encoder (if recording)
+        # and to registered listeners, called on the capture thread
+        self._record_lock = threading.Lock()
+        self._frame_listeners: List[Callable[[np.ndarray, float], None]] = []
+        
+        # Recycled frame buffers for the ring and the encoder queue, so
+        # steady-state capture and recording do not allocate per frame
+        self.frame_pool = FramePool(max_free=int(self.camera_config.get('frame_pool_max_free', 8)))
+        
+        # Encoders still draining their queue after stop_recording (path -> encoder)
+        self._finalizing: Dict[str, AsyncEncoder] = {}
+        self.last_encoder_stats: Optional[dict] = None
+        
+        # Encoders of the active recording (one per segment) and, for stopped
+        # recordings, (timing stats, encoders) by the path stop/switch returned
+        self._recording_encoders: List[AsyncEncoder] = []
+        self._frame_stats_pending: Dict[str, Tuple[dict, List[AsyncEncoder]]] = {}
+        
+        # Constant frame rate: frames are placed on a fixed fps timeline by
+        # capture timestamp, duplicating or dropping to match wall-clock time
+        self.constant_frame_rate = self.camera_config.get('constant_frame_rate', True)
+        self._timeline_start = 0.0
+        self._next_frame_index = 0
+        self._frames_in = 0
+        self._frames_out = 0
+        self._frames_duplicated = 0
+        self._frames_skipped = 0
+        self.last_recording_stats: Optional[dict] = None
+        
+        # Pre-roll: JPEG-encoded frames from the last few seconds before
+        # recording starts, sampled at the recording fps, capped in memory
+        recording_config = self.config.get('recording', {})
+        self.pre_roll_seconds = float(recording_config.get('pre_roll_seconds', 0))
+        self.pre_roll_max_bytes = int(recording_config.get('pre_roll_max_mb', 100) * 1024 * 1024)
+        self.pre_roll_quality = int(recording_config.get('pre_roll_jpeg_quality', 80))
+        self._pre_roll: deque = deque()  # (capture_time, jpeg bytes)
+        self._pre_roll_bytes = 0
+        
+        # Segmented recording: roll to a new file every segment_seconds of
+        # video so finished parts can be uploaded while recording continues
+        self.segment_seconds = float(recording_config.get('segment_seconds', 0))
+        self.recording_segments: List[str] = []  # Files of the current/last recording
+        self._segment_callback: Optional[Callable[[str], None]] = None
+        self._segment_frames = 0  # Frames per segment (0 = one file)
+        self._segment_written = 0  # Frames sent to the active segment
+        # Writer of the next segment, opened ahead on a background thread
+        # (path, encoder); guarded by _standby_lock
+        self._next_segment: Optional[Tuple[str, AsyncEncoder]] = None
+        
+        # Standby writer: opened in advance on a temporary name while recording,
+        # so switching to the next order swaps writers without opening one
+        self.standby_enabled = bool(recording_config.get('standby_writer', True))
+        self._standby: Optional[Tuple[str, AsyncEncoder, Optional[Tuple[int, int, int, int]]]] = None
+        self._standby_lock = threading.Lock()
+        # (temporary file, final file) of a recording started from the standby
+        # writer; the rename happens when that file is finalized
+        self.pending_rename: Optional[Tuple[str, str]] = None
+        
+        # Region of interest recorded instead of the full frame, normalized
+        # (x, y, width, height); fixed per recording when it starts
+        self.roi = self._parse_roi(self.camera_config.get('roi'))
+        self._recording_crop: Optional[Tuple[int, int, int, int]] = None
+        self.last_recording_crop: Optional[dict] = None
+        
         # Camera settings
         self.flip_horizontal = self.camera_config.get('flip_horizontal', False)
         self.brightness = self.camera_config.get('brightness', 50)
+        self.contrast = self.camera_config.get('contrast', 50)
+        self.gamma = self.camera_config.get('gamma', 100)
+        
+        # Software image controls compiled into one 256-entry lookup table,
+        # rebuilt only when a setting changes. Stored as (operation, operand):
+        # ('lut', table), or ('add'/'subtract', scalar) when the table is a
+        # pure brightness shift; None = identity, skip
+        self._adjustment: Optional[Tuple[str, object]] = None
+        self._rebuild_adjustment_lut()
+        
+        # Preview display: downscaled (then flipped) into reused buffers
+        self.preview_display_size = (
+            self.camera_config.get('preview_display_width', 640),
+            self.camera_config.get('preview_display_height', 360)
+        )
+        interpolation = self.camera_config.get('preview_interpolation', 'area')
+        self.preview_interpolation = self.INTERPOLATIONS.get(interpolation, cv2.INTER_AREA)
+        self._preview_buffer: Optional[np.ndarray] = None
+        self._preview_flip_buffer: Optional[np.ndarray] = None
+        
+        # Cached timestamp overlay, re-rendered when the text changes
+        self._timestamp_text: Optional[str] = None
+        self._timestamp_patch: Optional[np.ndarray] = None
+        self._timestamp_fitted: Optional[np.ndarray] = None  # Patch shrunk to fit a narrow crop
         
         # Create temp videos directory
         from .resource_path import get_app_dir
@@ -62,6 +291,11 @@ class CameraManager:
         """
         List all available cameras
         
+        Presence is taken from the OS device list, so only indices that are
+        new or hold a different device than in the previous scan are opened
+        for a full probe (frame read). Without a device list every index is
+        opened for a presence check.
+        
         Args:
             max_test: Maximum number of camera indices to test (default 3 for faster startup)
             
@@ -71,39 +305,136 @@ class CameraManager:
         available_cameras = []
         logger.info(f"Scanning for cameras (testing indices 0-{max_test-1})")
         
-        # Remember if current camera was open
-        current_was_open = self.cap is not None and self.cap.isOpened()
-        current_index = self.current_camera_index if current_was_open else None
+        # Listed outside the lock; may take a moment on Windows (ffmpeg)
+        devices = list_video_devices(self.ffmpeg_path)
         
         for i in range(max_test):
-            # Skip current camera if it's open to avoid disrupting it
-            if current_was_open and i == current_index:
-                # Use existing info
-                width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                camera_name = f"Camera {i} ({width}x{height})"
-                available_cameras.append((i, camera_name))
-                logger.info(f"Found: {camera_name} (currently active)")
-                continue
+            if devices is not None:
+                device_id = devices.get(i)
+                if device_id is None:
+                    self._forget_camera(i)
+                    continue
+                if self._camera_ids.get(i) == device_id and i in self._camera_cache:
+                    # Same device as last scan - nothing to open
+                    available_cameras.append((i, self._camera_cache[i]))
+                    continue
+                if i in self._camera_ids:
+                    # Another device took this index
+                    self._forget_camera(i)
             
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)  # Use DirectShow on Windows
-            if cap.isOpened():
-                # Try to read a frame
-                ret, _ = cap.read()
-                if ret:
-                    backend = cap.getBackendName()
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    camera_name = f"Camera {i} ({width}x{height})"
-                    available_cameras.append((i, camera_name))
-                    logger.info(f"Found: {camera_name} using {backend}")
-                cap.release()
+            # Serialize with start_camera so a probe never opens the device being started
+            with self._lock:
+                camera_name = self._check_camera_index(i)
+            if camera_name:
+                available_cameras.append((i, camera_name))
+                if devices is not None:
+                    self._camera_ids[i] = devices[i]
         
         if not available_cameras:
             logger.warning("No cameras found")
         
         return available_cameras
     
+    def list_available_cameras_async(
+        self,
+        callback: Callable[[List[Tuple[int, str]]], None],
+        max_test: int = 3
+    ) -> bool:
+        """
+        Enumerate cameras on a worker thread
+        
+        Args:
+            callback: Called with the camera list from the worker thread
+            max_test: Maximum number of camera indices to test
+            
+        Returns:
+            True if a scan was started, False if one is already running
+            (its result will still be delivered to that scan's callback)
+        """
+        with self._enumeration_lock:
+            if self._enumerating:
+                return False
+            self._enumerating = True
+        
+        def scan():
+            cameras = []
+            try:
+                cameras = self.list_available_cameras(max_test)
+            except Exception as e:
+                logger.error(f"Error scanning cameras: {str(e)}")
+            finally:
+                self._enumerating = False
+            callback(cameras)
+        
+        threading.Thread(target=scan, daemon=True).start()
+        return True
+    
+    def _check_camera_index(self, index: int) -> Optional[str]:
+        """
+        Check one camera index, using the capability cache when possible
+        
+        Args:
+            index: Camera index
+            
+        Returns:
+            Camera display name or None if not present
+        """
+        # Skip current camera if it's open to avoid disrupting it
+        if index == self.current_camera_index and self.cap is not None and self.cap.isOpened():
+            # Use existing info
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            camera_name = f"Camera {index} ({width}x{height})"
+            self._camera_cache[index] = camera_name
+            logger.info(f"Found: {camera_name} (currently active)")
+            return camera_name
+        
+        other = self.shared_cameras.get(index)
+        mode = None
+        if other is not None and other.cap is not None and other.cap.isOpened():
+            mode = other.get_capture_mode() or {}
+        elif index in self.external_cameras:
+            mode = self.external_cameras[index]
+        if mode is not None:
+            # Opened by another manager; reopening would fail or disturb it
+            camera_name = f"Camera {index} ({mode.get('width', 0)}x{mode.get('height', 0)})"
+            logger.info(f"Found: {camera_name} (recording camera)")
+            return camera_name
+        
+        cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)  # Use DirectShow on Windows
+        try:
+            if not cap.isOpened():
+                self._forget_camera(index)
+                return None
+            
+            cached_name = self._camera_cache.get(index)
+            if cached_name is not None:
+                # Presence unchanged - no need to read a frame again
+                return cached_name
+            
+            # Newly present: try to read a frame
+            ret, _ = cap.read()
+            if not ret:
+                return None
+            
+            backend = cap.getBackendName()
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            camera_name = f"Camera {index} ({width}x{height})"
+            self._camera_cache[index] = camera_name
+            logger.info(f"Found: {camera_name} using {backend}")
+            return camera_name
+        finally:
+            cap.release()
+    
+    def _forget_camera(self, index: int):
+        """Drop the cached name and negotiated format of an unplugged camera"""
+        if index in self._camera_cache:
+            logger.info(f"Camera {index} removed")
+        self._camera_cache.pop(index, None)
+        self._camera_ids.pop(index, None)
+        self._capture_modes.pop(index, None)
+    
     def start_camera(self, camera_index: int = 0) -> bool:
         """
         Start camera preview
@@ -114,10 +445,18 @@ class CameraManager:
         Returns:
             True if successful, False otherwise
         """
+        # Device lookup (for the persisted capture mode) stays outside the lock
+        cache_key = None
+        if camera_index not in self._capture_modes:
+            cache_key = self._mode_cache_key(camera_index)
+        
         with self._lock:
             try:
                 self._is_switching = True
                 
+                # Capture thread must not be inside cap.read() while releasing
+                self._stop_capture_thread()
+                
                 if self.cap is not None:
                     self.cap.release()
                     self.cap = None
@@ -130,10 +469,23 @@ class CameraManager:
                     self._is_switching = False
                     return False
                 
-                # Set resolution (same for preview and recording to avoid switching)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.camera_config['preview_width'])
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.camera_config['preview_height'])
-                self.cap.set(cv2.CAP_PROP_FPS, self.camera_config['fps'])
+                # Set format and resolution (same for preview and recording to
+                # avoid switching); probed once per device, then cached
+                mode = self._capture_modes.get(camera_index)
+                if mode is None:
+                    mode = self._apply_cached_mode(cache_key) if cache_key else None
+                    if mode is None:
+                        mode = self._negotiate_capture_mode(camera_index)
+                        if cache_key:
+                            self._store_cached_mode(cache_key, mode)
+                    self._capture_modes[camera_index] = mode
+                else:
+                    self._set_capture_mode(mode['fourcc'])
+                self.capture_mode = mode
+                logger.info(
+                    f"Camera {camera_index} capture mode: {mode['fourcc'] or 'default'} "
+                    f"{mode['width']}x{mode['height']} @ {mode['measured_fps']:.1f} fps measured"
+                )
                 
                 # Apply camera settings
                 self._apply_camera_settings()
@@ -141,6 +493,8 @@ class CameraManager:
                 self.current_camera_index = camera_index
                 logger.info(f"Camera {camera_index} started successfully at {self.camera_config['preview_width']}x{self.camera_config['preview_height']}")
                 
+                self._start_capture_thread()
+                
                 self._is_switching = False
                 return True
                 
@@ -149,68 +503,937 @@ class CameraManager:
                 self._is_switching = False
                 return False
     
+    def _set_capture_mode(self, fourcc: str):
+        """
+        Request pixel format, resolution and fps on the open capture
+        
+        Args:
+            fourcc: FOURCC code (e.g. 'MJPG', 'YUY2') or '' for driver default
+        """
+        # FOURCC must be set before the resolution for many DirectShow drivers
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.camera_config['preview_width'])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.camera_config['preview_height'])
+        self.cap.set(cv2.CAP_PROP_FPS, self.camera_config['fps'])
+    
+    def _measure_capture_mode(self, fourcc: str) -> dict:
+        """
+        Apply a capture format and measure the frame rate it sustains
+        
+        Args:
+            fourcc: FOURCC code to try ('' keeps driver default)
+            
+        Returns:
+            Dictionary with requested and negotiated format, size and measured fps
+        """
+        self._set_capture_mode(fourcc)
+        
+        probe_frames = max(2, int(self.camera_config.get('capture_probe_frames', 12)))
+        warmup_frames = 3
+        frame = None
+        frames_read = 0
+        start = time.monotonic()
+        deadline = start + self.CAPTURE_PROBE_SECONDS
+        
+        for i in range(warmup_frames + probe_frames):
+            if time.monotonic() > deadline:
+                # Slow format; enough frames to tell it apart
+                break
+            ret, frame = self.cap.read(frame)
+            if not ret:
+                break
+            if i == warmup_frames - 1:
+                # Exclude driver start-up latency from the measurement
+                start = time.monotonic()
+            elif i >= warmup_frames:
+                frames_read += 1
+        
+        elapsed = time.monotonic() - start
+        measured_fps = frames_read / elapsed if frames_read and elapsed > 0 else 0.0
+        
+        return {
+            "requested": fourcc,
+            "fourcc": self._decode_fourcc(self.cap.get(cv2.CAP_PROP_FOURCC)) or fourcc,
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "reported_fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "measured_fps": measured_fps
+        }
+    
+    def _negotiate_capture_mode(self, camera_index: int) -> dict:
+        """
+        Probe capture formats and keep the best one at the configured size
+        
+        Uncompressed YUYV at 1080p is limited to a few fps over USB 2.0,
+        so MJPG is usually much faster on webcams. Formats that fell back to
+        another resolution only count if none delivers the configured one;
+        candidates are preferred in order (MJPG first, it needs far less USB
+        bandwidth) unless a later one is faster by CAPTURE_FPS_MARGIN.
+        
+        Args:
+            camera_index: Index of the open camera (for logging)
+            
+        Returns:
+            Selected capture mode (as returned by _measure_capture_mode)
+        """
+        configured = str(self.camera_config.get('capture_format', 'auto') or '').upper()
+        if configured == 'AUTO':
+            candidates = ['MJPG', 'YUY2']
+        else:
+            candidates = [configured]
+        
+        modes = []
+        for fourcc in candidates:
+            mode = self._measure_capture_mode(fourcc)
+            logger.info(
+                f"Camera {camera_index} probe {fourcc or 'default'}: got {mode['fourcc'] or '?'} "
+                f"{mode['width']}x{mode['height']} @ {mode['measured_fps']:.1f} fps"
+            )
+            modes.append(mode)
+        
+        requested_size = (self.camera_config['preview_width'], self.camera_config['preview_height'])
+        eligible = [m for m in modes if (m['width'], m['height']) == requested_size]
+        if not eligible:
+            # No format gives the configured size; keep the largest frames
+            largest = max(m['width'] * m['height'] for m in modes)
+            eligible = [m for m in modes if m['width'] * m['height'] == largest]
+            logger.warning(
+                f"Camera {camera_index} does not deliver {requested_size[0]}x{requested_size[1]}, "
+                f"using {eligible[0]['width']}x{eligible[0]['height']}"
+            )
+        
+        # Measured fps is noisy; only a clear margin overrides candidate order
+        best = eligible[0]
+        for mode in eligible[1:]:
+            if mode['measured_fps'] > best['measured_fps'] * self.CAPTURE_FPS_MARGIN:
+                best = mode
+        if best is not modes[-1]:
+            self._set_capture_mode(best['requested'])
+        
+        return best
+    
+    def _mode_cache_key(self, camera_index: int) -> str:
+        """Key of a device's capture mode in capture_modes.json (device and requested settings)"""
+        devices = list_video_devices(self.ffmpeg_path)
+        device = devices.get(camera_index) if devices else None
+        return "|".join([
+            device or f"index {camera_index}",
+            str(self.camera_config.get('capture_format', 'auto') or '').upper(),
+            f"{self.camera_config['preview_width']}x{self.camera_config['preview_height']}@{self.camera_config['fps']}"
+        ])
+    
+    def _read_mode_cache(self) -> Dict[str, dict]:
+        """Persisted capture modes ({} if missing or unreadable)"""
+        try:
+            with open(self._mode_cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable capture mode cache: {e}")
+            return {}
+    
+    def _apply_cached_mode(self, cache_key: str) -> Optional[dict]:
+        """
+        Apply a capture mode negotiated on an earlier launch
+        
+        Args:
+            cache_key: Key from _mode_cache_key()
+        
+        Returns:
+            The mode if the camera still delivers its size, None to probe again
+        """
+        mode = self._read_mode_cache().get(cache_key)
+        if mode is None:
+            return None
+        
+        self._set_capture_mode(mode['requested'])
+        size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if size != (mode['width'], mode['height']):
+            logger.info(f"Cached capture mode no longer applies ({size[0]}x{size[1]}), probing again")
+            return None
+        return mode
+    
+    def _store_cached_mode(self, cache_key: str, mode: dict):
+        """Persist a negotiated capture mode for the next launch"""
+        modes = self._read_mode_cache()
+        modes[cache_key] = mode
+        try:
+            with open(self._mode_cache_path, 'w', encoding='utf-8') as f:
+                json.dump(modes, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning(f"Failed to save capture mode cache: {e}")
+    
+    @staticmethod
+    def _decode_fourcc(value: float) -> str:
+        """Convert CAP_PROP_FOURCC value to its 4-character code"""
+        code = int(value)
+        if code <= 0:
+            return ''
+        return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ')
+    
+    def _capture_size(self) -> Tuple[int, int]:
+        """Size of captured frames (newest frame, else negotiated mode, else config)"""
+        with self._frame_lock:
+            if self._latest_slot >= 0:
+                height, width = self._ring[self._latest_slot].shape[:2]
+                return width, height
+        
+        if self.capture_mode:
+            return self.capture_mode['width'], self.capture_mode['height']
+        return self.camera_config['recording_width'], self.camera_config['recording_height']
+    
+    def is_camera_open(self) -> bool:
+        """Check if a camera is opened"""
+        cap = self.cap
+        return cap is not None and cap.isOpened()
+    
+    def share_camera(self, index: int, camera: "CameraManager"):
+        """
+        Register a camera opened by another manager so scans do not reopen it
+        
+        Args:
+            index: Camera index
+            camera: Manager holding the device
+        """
+        self.shared_cameras[index] = camera
+    
+    def unshare_camera(self, index: int):
+        """Forget a camera registered with share_camera()"""
+        self.shared_cameras.pop(index, None)
+    
+    def set_external_camera(self, index: int, mode: Optional[dict]):
+        """
+        Register a camera held open in another process (process isolation)
+        
+        Args:
+            index: Camera index
+            mode: Its capture mode (for the display name), None to forget it
+        """
+        if mode is None:
+            self.external_cameras.pop(index, None)
+        else:
+            self.external_cameras[index] = mode
+    
+    @property
+    def frame_sequence(self) -> int:
+        """Number of frames captured so far (changes with every new frame)"""
+        return self._frame_seq
+    
+    def get_capture_mode(self) -> Optional[dict]:
+        """
+        Get the negotiated capture mode of the current camera
+        
+        Returns:
+            Dictionary with fourcc, width, height and measured fps, or None
+        """
+        return self.capture_mode
+    
     def stop_camera(self):
         """Stop camera preview and recording"""
         with self._lock:
             if self.is_recording:
                 self.stop_recording()
+            self._discard_standby()
+            self._discard_next_segment()
+            
+            # Let pending recordings finish writing before the camera goes away
+            for path in list(self._finalizing):
+                self.wait_for_recording(path)
+            
+            self._stop_capture_thread()
+            self._reset_ring()
             
             if self.cap is not None:
                 self.cap.release()
                 self.cap = None
                 logger.info("Camera stopped")
     
-    def get_frame(self) -> Optional[np.ndarray]:
+    def _start_capture_thread(self):
+        """Start background thread reading frames into the ring buffer"""
+        self._reset_ring()
+        self._capture_running = True
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
+    
+    def _stop_capture_thread(self):
+        """Stop background capture thread and wait for the current read to finish"""
+        self._capture_running = False
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=2)
+            self._capture_thread = None
+    
+    def _reset_ring(self):
+        """Drop buffered frames (e.g. after a camera switch)"""
+        with self._frame_lock:
+            # Capture thread is stopped, so the slots can be recycled
+            for buffer in self._ring:
+                if buffer is not None:
+                    self.frame_pool.release(buffer)
+            self._ring = [None] * self._ring_size
+            self._ring_times = [0.0] * self._ring_size
+            self._latest_slot = -1
+        
+        with self._record_lock:
+            self._pre_roll.clear()
+            self._pre_roll_bytes = 0
+    
+    def _capture_loop(self):
+        """Background thread loop reading frames at the camera's native rate"""
+        logger.debug("Capture loop started")
+        read_failed = False
+        
+        while self._capture_running:
+            cap = self.cap
+            if cap is None or not cap.isOpened():
+                time.sleep(0.05)
+                continue
+            
+            # Read into the slot after the newest one; readers only copy the
+            # newest slot, so this buffer is never being read concurrently
+            slot = (self._latest_slot + 1) % self._ring_size
+            buffer = self._ring[slot]
+            if buffer is None and self.capture_mode:
+                buffer = self.frame_pool.acquire((self.capture_mode['height'], self.capture_mode['width'], 3))
+            
+            try:
+                if buffer is not None:
+                    ret, frame = cap.read(buffer)
+                else:
+                    ret, frame = cap.read()
+            except Exception as e:
+                logger.error(f"Error in capture loop: {str(e)}")
+                ret, frame = False, None
+            
+            if not ret or frame is None:
+                # Only log once per failure streak (and not during camera changes)
+                if not read_failed and not self._is_switching:
+                    logger.warning("Failed to read frame")
+                read_failed = True
+                time.sleep(0.01)
+                continue
+            read_failed = False
+            capture_time = time.monotonic()
+            
+            # Process once; recording, preview and listeners share the result
+            frame = self._process_frame(frame)
+            
+            with self._frame_lock:
+                # cap.read() reallocates if the resolution changed
+                self._ring[slot] = frame
+                self._ring_times[slot] = capture_time
+                self._latest_slot = slot
+                self._frame_seq += 1
+            
+            self._dispatch_frame(frame, capture_time)
+        
+        logger.debug("Capture loop ended")
+    
+    def _process_frame(self, frame: np.ndarray) -> np.ndarray:
         """
-        Get current frame from camera for recording (no flip applied)
+        Apply image adjustments and timestamp overlay (no flip)
         
+        Args:
+            frame: Raw captured frame
+            
         Returns:
-            Frame as numpy array or None if failed
+            Processed frame in original orientation
         """
-        # Skip frame read if camera is being switched
-        if self._is_switching:
+        # Apply camera settings as image processing
+        frame = self._apply_image_adjustments(frame)
+        
+        # Add timestamp overlay if configured
+        if self.camera_config['timestamp_overlay']:
+            frame = self._add_timestamp(frame)
+        
+        return frame
+    
+    def _dispatch_frame(self, frame: np.ndarray, capture_time: float):
+        """
+        Deliver one processed frame to the encoder and frame listeners
+        
+        Args:
+            frame: Processed frame (only valid for the duration of the call)
+            capture_time: time.monotonic() when the frame was read
+        """
+        with self._record_lock:
+            if self.is_recording:
+                self._record_frame(frame, capture_time)
+            elif self.pre_roll_seconds > 0:
+                self._buffer_pre_roll(frame, capture_time)
+        
+        for listener in list(self._frame_listeners):
+            try:
+                listener(frame, capture_time)
+            except Exception as e:
+                logger.error(f"Error in frame listener: {str(e)}")
+    
+    def _record_frame(self, frame: np.ndarray, capture_time: float):
+        """
+        Send a captured frame to the encoder, keeping constant frame rate
+        
+        Args:
+            frame: Processed frame
+            capture_time: time.monotonic() when the frame was read
+        """
+        for _ in range(self._timeline_repeats(capture_time)):
+            if self._segment_frames and self._segment_written >= self._segment_frames:
+                self._roll_segment()
+            self.write_frame(frame)
+            self._segment_written += 1
+    
+    def _parse_roi(self, roi: Optional[Sequence[float]]) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Validate a normalized ROI
+        
+        Args:
+            roi: (x, y, width, height) as fractions of the frame, or None/empty
+        
+        Returns:
+            Clamped ROI, or None for the full frame
+        """
+        if not roi:
+            return None
+        
+        try:
+            x, y, width, height = (float(value) for value in roi)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid ROI {roi!r} - recording the full frame")
             return None
+        
+        x = min(max(x, 0.0), 1.0 - self.MIN_ROI_SIZE)
+        y = min(max(y, 0.0), 1.0 - self.MIN_ROI_SIZE)
+        width = min(max(width, self.MIN_ROI_SIZE), 1.0 - x)
+        height = min(max(height, self.MIN_ROI_SIZE), 1.0 - y)
+        
+        if width >= 0.999 and height >= 0.999:
+            return None
+        return (x, y, width, height)
+    
+    def set_roi(self, roi: Optional[Sequence[float]]):
+        """
+        Set the region of interest (applies from the next recording)
+        
+        Args:
+            roi: (x, y, width, height) as fractions of the unflipped frame,
+                or None to record the full frame
+        """
+        self.roi = self._parse_roi(roi)
+        
+        if self.roi is None:
+            logger.info("ROI cleared - recording the full frame")
+        else:
+            # Not persisted; copy into camera.roi to keep it
+            logger.info(f"ROI set to [{', '.join(f'{v:.3f}' for v in self.roi)}]")
+    
+    def _crop_rect(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Convert the ROI to a pixel rectangle
+        
+        Args:
+            width: Frame width
+            height: Frame height
+        
+        Returns:
+            (x, y, width, height) in pixels with even sizes (required by
+            yuv420p encoders), or None for the full frame
+        """
+        if self.roi is None:
+            return None
+        
+        rx, ry, rw, rh = self.roi
+        x, y = int(rx * width), int(ry * height)
+        w = min(int(rw * width), width - x) & ~1
+        h = min(int(rh * height), height - y) & ~1
+        return (x, y, w, h)
+    
+    def get_recording_crop(self) -> Optional[dict]:
+        """
+        Get the crop of the current or last recording
+        
+        Returns:
+            Dictionary with x, y, width, height and source size in pixels,
+            or None if the full frame was recorded
+        """
+        return self.last_recording_crop
+    
+    def check_disk_space(self, max_seconds: float) -> bool:
+        """
+        Check free space in the temp directory against the expected file size
+        
+        Args:
+            max_seconds: Recording time limit (0 = no limit)
             
-        if self.cap is None or not self.cap.isOpened():
+        Returns:
+            True if there is room for the recording plus the reserve
+        """
+        seconds = max_seconds if max_seconds > 0 else self.UNLIMITED_RECORDING_ESTIMATE
+        seconds += self.pre_roll_seconds
+        
+        bitrate_mbps = float(self.storage_config.get('expected_bitrate_mbps', 8))
+        reserve_bytes = float(self.storage_config.get('min_free_mb', 500)) * 1024 * 1024
+        needed = bitrate_mbps * 1_000_000 / 8 * seconds + reserve_bytes
+        
+        try:
+            free = shutil.disk_usage(self.temp_dir).free
+        except OSError as e:
+            # Do not block recording if the check itself fails
+            logger.warning(f"Could not check free disk space: {str(e)}")
+            self.disk_space_low = False
+            return True
+        
+        self.disk_space_low = free < needed
+        if self.disk_space_low:
+            logger.error(
+                f"Not enough disk space to record: {free / 1024 / 1024:.0f} MB free, "
+                f"{needed / 1024 / 1024:.0f} MB needed ({seconds:.0f}s at {bitrate_mbps:g} Mbps + reserve)"
+            )
+        return not self.disk_space_low
+    
+    def _segment_path(self, number: int, output_path: Optional[str] = None) -> str:
+        """
+        Get file path of a recording segment
+        
+        Args:
+            number: Segment number (starting at 1)
+            output_path: Recording path (default: the current recording)
+            
+        Returns:
+            Recording path with a _partNNN suffix
+        """
+        base = Path(output_path or self.current_output_path)
+        return str(base.with_name(f"{base.stem}_part{number:03d}{base.suffix}"))
+    
+    def _create_encoder(
+        self,
+        output_path: str,
+        crop: Optional[Tuple[int, int, int, int]],
+        preload: Optional[List[bytes]] = None
+    ) -> Optional[AsyncEncoder]:
+        """
+        Open a video writer and its encoder thread
+        
+        Args:
+            output_path: Output video file
+            crop: Pixel crop of the recording (None = full frame)
+            preload: JPEG frames written before any submitted frame
+            
+        Returns:
+            AsyncEncoder or None if the writer could not be opened
+        """
+        # OpenCV or ffmpeg, see camera.encoder; a cropped recording keeps
+        # the crop's pixel size instead of scaling up to the recording size
+        if crop is not None:
+            frame_size = (crop[2], crop[3])
+        else:
+            frame_size = (self.camera_config['recording_width'], self.camera_config['recording_height'])
+        writer = create_video_writer(output_path, self.camera_config['fps'], frame_size, self.config)
+        
+        if not writer.isOpened():
+            logger.error(f"Failed to create video writer: {output_path}")
             return None
         
-        ret, frame = self.cap.read()
-        if not ret:
-            # Only log warning if not switching (to avoid spam during camera changes)
-            if not self._is_switching:
-                logger.warning("Failed to read frame")
+        # Encoding runs on its own thread so capture never waits on it
+        return AsyncEncoder(
+            writer,
+            frame_size,
+            queue_size=self.camera_config.get('encoder_queue_size', 30),
+            policy=self.camera_config.get('encoder_backpressure', AsyncEncoder.DROP_OLDEST),
+            preload=preload,
+            pool=self.frame_pool,
+            crop=crop
+        )
+    
+    def _roll_segment(self):
+        """Close the active segment and continue in a new file (called with _record_lock held)"""
+        next_path = self._segment_path(len(self.recording_segments) + 1)
+        encoder = self._take_next_segment(next_path)
+        if encoder is None:
+            # Not ready yet; opening here holds up the capture thread
+            logger.warning(f"Next segment writer not ready, opening on the capture thread: {next_path}")
+            encoder = self._create_encoder(next_path, self._recording_crop)
+        
+        # Keep writing to the current file rather than losing frames
+        self._segment_written = 0
+        if encoder is None:
+            return
+        
+        finished_path = self._active_path
+        self.encoder.close()
+        self._finalizing[finished_path] = self.encoder
+        
+        self.encoder = encoder
+        self._recording_encoders.append(encoder)
+        self._active_path = next_path
+        self.recording_segments.append(next_path)
+        logger.info(f"Recording segment finished: {finished_path}")
+        self._prepare_next_segment_async()
+        
+        # Runs on the capture thread - callback must only hand the path off
+        if self._segment_callback is not None:
+            try:
+                self._segment_callback(finished_path)
+            except Exception as e:
+                logger.error(f"Segment callback failed: {str(e)}")
+    
+    def _prepare_next_segment(self):
+        """Open the writer of the next segment if there is none"""
+        with self._standby_lock:
+            if self._next_segment is not None or not self.is_recording or not self._segment_frames:
+                return
+            
+            path = self._segment_path(len(self.recording_segments) + 1)
+            encoder = self._create_encoder(path, self._recording_crop)
+            if encoder is None:
+                return
+            
+            # Recording stopped or switched while the writer was opening
+            if not self.is_recording or path != self._segment_path(len(self.recording_segments) + 1):
+                self._discard_encoder(path, encoder)
+                return
+            
+            self._next_segment = (path, encoder)
+            logger.debug(f"Next segment writer ready: {Path(path).name}")
+    
+    def _prepare_next_segment_async(self):
+        """Open the next segment's writer on a background thread (opening can take a while)"""
+        if self._segment_frames:
+            threading.Thread(target=self._prepare_next_segment, daemon=True).start()
+    
+    def _take_next_segment(self, path: str) -> Optional[AsyncEncoder]:
+        """
+        Take the writer opened ahead for a segment
+        
+        Args:
+            path: File of the segment about to start
+        
+        Returns:
+            The encoder, or None if none is ready for this path
+        """
+        with self._standby_lock:
+            prepared, self._next_segment = self._next_segment, None
+        
+        if prepared is None:
+            return None
+        if prepared[0] != path:
+            # Left over from a recording that was switched or stopped
+            self._discard_encoder(*prepared)
             return None
+        return prepared[1]
+    
+    def _discard_next_segment(self):
+        """Close an unused next-segment writer and delete its file"""
+        with self._standby_lock:
+            prepared, self._next_segment = self._next_segment, None
         
-        # Apply camera settings as image processing
-        frame = self._apply_image_adjustments(frame)
+        if prepared is not None:
+            self._discard_encoder(*prepared)
+    
+    def _timeline_repeats(self, capture_time: float) -> int:
+        """
+        Decide how many times a frame is written to keep constant frame rate
         
-        # Add timestamp overlay if configured
-        if self.camera_config['timestamp_overlay']:
-            frame = self._add_timestamp(frame)
+        Args:
+            capture_time: time.monotonic() when the frame was read
+            
+        Returns:
+            Number of copies to write (0 = skip, >1 = fill missed slots)
+        """
+        self._frames_in += 1
         
-        # NO flip applied - recording uses original orientation
+        if not self.constant_frame_rate:
+            self._frames_out += 1
+            return 1
         
-        return frame
+        # Slot of this frame on the output timeline
+        fps = self.camera_config['fps']
+        index = max(0, int(round((capture_time - self._timeline_start) * fps)))
+        
+        if index < self._next_frame_index:
+            # Camera delivered faster than fps - slot already filled
+            self._frames_skipped += 1
+            return 0
+        
+        # Repeat this frame to fill slots missed since the previous frame
+        repeats = index - self._next_frame_index + 1
+        self._frames_out += repeats
+        self._frames_duplicated += repeats - 1
+        self._next_frame_index = index + 1
+        return repeats
+    
+    def _buffer_pre_roll(self, frame: np.ndarray, capture_time: float):
+        """
+        Keep a JPEG copy of the frame for pre-roll (called with _record_lock held)
+        
+        Args:
+            frame: Processed frame
+            capture_time: time.monotonic() when the frame was read
+        """
+        # Only keep one frame per recording frame slot
+        fps = self.camera_config['fps']
+        if self._pre_roll and round(capture_time * fps) == round(self._pre_roll[-1][0] * fps):
+            return
+        
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.pre_roll_quality])
+        if not ok:
+            return
+        
+        data = encoded.tobytes()
+        self._pre_roll.append((capture_time, data))
+        self._pre_roll_bytes += len(data)
+        
+        # Evict by age and by the memory ceiling
+        while self._pre_roll and (
+            capture_time - self._pre_roll[0][0] > self.pre_roll_seconds or
+            self._pre_roll_bytes > self.pre_roll_max_bytes
+        ):
+            _, old = self._pre_roll.popleft()
+            self._pre_roll_bytes -= len(old)
+    
+    def _take_pre_roll(self, start_time: float) -> Tuple[float, List[bytes]]:
+        """
+        Move buffered pre-roll frames onto the new recording's timeline
+        (called with _record_lock held)
+        
+        Args:
+            start_time: time.monotonic() when recording was requested
+            
+        Returns:
+            Tuple of (timeline start, JPEG frames to write in order)
+        """
+        frames = [(t, data) for t, data in self._pre_roll if start_time - t <= self.pre_roll_seconds]
+        self._pre_roll.clear()
+        self._pre_roll_bytes = 0
+        
+        if not frames:
+            return start_time, []
+        
+        self._timeline_start = frames[0][0]
+        self._pre_roll_frames = len(frames)
+        encoded = []
+        for capture_time, data in frames:
+            encoded.extend([data] * self._timeline_repeats(capture_time))
+        return self._timeline_start, encoded
+    
+    def _build_recording_stats(self, stop_time: float) -> dict:
+        """
+        Summarize frame timing of the recording that is being stopped
+        
+        Args:
+            stop_time: time.monotonic() when recording stopped
+            
+        Returns:
+            Dictionary with frame counters, durations and timing drift
+        """
+        fps = self.camera_config['fps']
+        wall_duration = max(0.0, stop_time - self._timeline_start)
+        media_duration = self._frames_out / fps if fps else 0.0
+        
+        return {
+            "mode": "cfr" if self.constant_frame_rate else "vfr",
+            "fps": fps,
+            "frames_in": self._frames_in,
+            "frames_out": self._frames_out,
+            "frames_duplicated": self._frames_duplicated,
+            "frames_skipped": self._frames_skipped,
+            "pre_roll_frames": self._pre_roll_frames,  # Included in frames_in
+            "capture_duration": round(max(0.0, stop_time - self._capture_start), 3),  # Without pre-roll
+            "wall_duration": round(wall_duration, 3),
+            "media_duration": round(media_duration, 3),
+            # Positive: video plays longer than real time, negative: shorter
+            "timing_drift": round(media_duration - wall_duration, 3)
+        }
+    
+    def _keep_frame_stats(self, output_path: str):
+        """Hold a finished recording's counters until get_frame_stats() (called with _record_lock held)"""
+        self._frame_stats_pending[output_path] = (dict(self.last_recording_stats), self._recording_encoders)
+        self._recording_encoders = []
+        
+        # Only the most recent recordings are kept if nobody asks
+        while len(self._frame_stats_pending) > self.MAX_PENDING_FRAME_STATS:
+            self._frame_stats_pending.pop(next(iter(self._frame_stats_pending)))
+    
+    def get_frame_stats(self, output_path: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Get frame counters of a stopped recording (all segments together)
+        
+        Waits for the recording's encoders to finish so the counts are final.
+        
+        Args:
+            output_path: Path returned by stop_recording or switch_recording
+            timeout: Maximum seconds to wait for each encoder
+            
+        Returns:
+            Dictionary with fps, frames captured/encoded/dropped/duplicated/
+            skipped, pre_roll_frames (buffered before the start, not in
+            captured), media_duration (seconds of video in the file),
+            wall_duration and capture_fps (captured frames over the time
+            from start to stop), or None if unknown
+        """
+        entry = self._frame_stats_pending.pop(output_path, None)
+        if entry is None:
+            return None
+        
+        timing, encoders = entry
+        for encoder in encoders:
+            encoder.wait(timeout)
+        
+        fps = timing['fps']
+        encoded = sum(encoder.frames_written for encoder in encoders)
+        captured = timing['frames_in'] - timing['pre_roll_frames']
+        capture_duration = timing['capture_duration']
+        stats = {
+            "fps": fps,
+            "captured": captured,
+            "pre_roll_frames": timing['pre_roll_frames'],
+            "encoded": encoded,
+            "dropped": sum(encoder.frames_dropped for encoder in encoders),
+            "write_errors": sum(encoder.write_errors for encoder in encoders),
+            "duplicated": timing['frames_duplicated'],
+            "skipped": timing['frames_skipped'],
+            "media_duration": round(encoded / fps, 3) if fps else 0.0,
+            "wall_duration": timing['wall_duration'],
+            # Rate the camera actually delivered; below fps means the station cannot keep up
+            "capture_fps": round(captured / capture_duration, 2) if capture_duration > 0 else 0.0
+        }
+        
+        if stats['capture_fps'] < fps * 0.9 or stats['dropped']:
+            logger.warning(
+                f"Recording did not sustain {fps} fps: camera delivered {stats['capture_fps']} fps, "
+                f"encoder dropped {stats['dropped']} of {stats['captured']} frames"
+            )
+        return stats
+    
+    def get_recording_stats(self) -> Optional[dict]:
+        """
+        Get timing statistics of the last stopped recording
+        
+        Returns:
+            Dictionary from the last stop_recording() or None
+        """
+        return self.last_recording_stats
+    
+    def add_frame_listener(self, listener: Callable[[np.ndarray, float], None]):
+        """
+        Register a consumer for every processed frame
+        
+        Listeners run on the capture thread and receive the shared frame
+        buffer, so they must be quick and copy anything they keep.
+        
+        Args:
+            listener: Function called with (frame, capture_time)
+        """
+        if listener not in self._frame_listeners:
+            self._frame_listeners.append(listener)
+    
+    def remove_frame_listener(self, listener: Callable[[np.ndarray, float], None]):
+        """Unregister a frame consumer added with add_frame_listener"""
+        if listener in self._frame_listeners:
+            self._frame_listeners.remove(listener)
+    
+    def get_frame(self) -> Optional[np.ndarray]:
+        """
+        Get copy of newest processed frame (no flip applied)
+        
+        Returns:
+            Frame as numpy array or None if no frame is available
+        """
+        # Skip frame read if camera is being switched
+        if self._is_switching:
+            return None
+        
+        with self._frame_lock:
+            if self._latest_slot < 0:
+                return None
+            # Already adjusted and timestamped by the capture thread
+            return self._ring[self._latest_slot].copy()
     
     def get_frame_for_preview(self) -> Optional[np.ndarray]:
         """
-        Get current frame for preview (with flip applied if enabled)
+        Get newest processed frame for preview (with flip applied if enabled)
+        
+        Recording is fed directly from the capture thread, so the preview
+        never triggers another read or another processing pass.
         
         Returns:
-            Frame as numpy array or None if failed
+            Frame as numpy array or None if no frame is available
+        """
+        if self._is_switching:
+            return None
+        
+        with self._frame_lock:
+            if self._latest_slot < 0:
+                return None
+            frame = self._ring[self._latest_slot]
+            
+            if self.flip_horizontal:
+                # Flip horizontally for preview only (mirror effect)
+                return cv2.flip(frame, 1)
+            return frame.copy()
+    
+    def get_preview_frame(self) -> Optional[np.ndarray]:
         """
-        frame = self.get_frame()
+        Get newest frame downscaled for on-screen preview (flip applied if enabled)
         
-        if frame is not None and self.flip_horizontal:
+        The frame is shrunk to fit preview_display_width x preview_display_height
+        before flipping, so only the small image is flipped. The returned array
+        is reused by the next call; copy it if it must outlive that.
+        
+        Returns:
+            Downscaled BGR frame or None if no frame is available
+        """
+        if self._is_switching:
+            return None
+        
+        with self._frame_lock:
+            if self._latest_slot < 0:
+                return None
+            frame = self._ring[self._latest_slot]
+            
+            frame_h, frame_w = frame.shape[:2]
+            width, height = self._fit_preview_size(frame_w, frame_h)
+            shape = (height, width, 3)
+            if self._preview_buffer is None or self._preview_buffer.shape != shape:
+                self._preview_buffer = np.empty(shape, dtype=np.uint8)
+                self._preview_flip_buffer = np.empty(shape, dtype=np.uint8)
+            
+            cv2.resize(
+                frame,
+                (width, height),
+                dst=self._preview_buffer,
+                interpolation=self.preview_interpolation
+            )
+        
+        if self.flip_horizontal:
             # Flip horizontally for preview only (mirror effect)
-            frame = cv2.flip(frame, 1)
+            cv2.flip(self._preview_buffer, 1, dst=self._preview_flip_buffer)
+            return self._preview_flip_buffer
         
-        return frame
+        return self._preview_buffer
+    
+    def _fit_preview_size(self, frame_w: int, frame_h: int) -> Tuple[int, int]:
+        """
+        Fit frame size into the preview display box keeping aspect ratio
+        
+        Args:
+            frame_w: Frame width
+            frame_h: Frame height
+            
+        Returns:
+            Tuple of (width, height), never larger than the frame
+        """
+        box_w, box_h = self.preview_display_size
+        scale = min(box_w / frame_w, box_h / frame_h, 1.0)
+        return max(1, int(frame_w * scale)), max(1, int(frame_h * scale))
     
     def _add_timestamp(self, frame: np.ndarray) -> np.ndarray:
         """
         Add timestamp overlay to frame
         
+        The overlay patch is rendered only when the text changes (once per
+        second) and copied into the frame with a single slice assignment.
+        
         Args:
             frame: Input frame
             
@@ -219,14 +1442,59 @@ class CameraManager:
         """
         timestamp = datetime.now().strftime(self.camera_config['timestamp_format'])
         
-        # Add black rectangle background for text
-        cv2.rectangle(frame, (10, 10), (350, 50), (0, 0, 0), -1)
+        if timestamp != self._timestamp_text:
+            self._timestamp_patch = self._render_timestamp_patch(timestamp)
+            self._timestamp_fitted = None
+            self._timestamp_text = timestamp
+        
+        patch = self._timestamp_patch
+        x, y = self.TIMESTAMP_ORIGIN
+        
+        # Keep the timestamp inside the recorded region
+        crop = self._recording_crop if self.is_recording else self._crop_rect(frame.shape[1], frame.shape[0])
+        if crop is None:
+            crop = (0, 0, frame.shape[1], frame.shape[0])
+        area_w = max(0, crop[2] - x)
+        area_h = max(0, crop[3] - y)
+        
+        # Narrow crops get a scaled-down patch (rendered once per text) so
+        # the whole timestamp is recorded
+        if 0 < area_w < patch.shape[1]:
+            if self._timestamp_fitted is None or self._timestamp_fitted.shape[1] != area_w:
+                height = max(1, round(patch.shape[0] * area_w / patch.shape[1]))
+                self._timestamp_fitted = cv2.resize(patch, (area_w, height), interpolation=cv2.INTER_AREA)
+            patch = self._timestamp_fitted
+        
+        x += crop[0]
+        y += crop[1]
+        
+        roi = frame[y:y + min(patch.shape[0], area_h), x:x + min(patch.shape[1], area_w)]
+        # Clip patch for crops/frames smaller than the overlay
+        roi[...] = patch[:roi.shape[0], :roi.shape[1]]
+        
+        return frame
+    
+    def _render_timestamp_patch(self, timestamp: str) -> np.ndarray:
+        """
+        Render timestamp text on a black background patch
+        
+        Args:
+            timestamp: Formatted timestamp text
+            
+        Returns:
+            BGR patch placed at TIMESTAMP_ORIGIN in the frame
+        """
+        (text_w, _), _ = cv2.getTextSize(timestamp, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        
+        # Black rectangle (10, 10)-(350, 50); wider if the format needs it
+        width = max(341, text_w + 20)
+        patch = np.zeros((41, width, 3), dtype=np.uint8)
         
         # Add white text
         cv2.putText(
-            frame,
+            patch,
             timestamp,
-            (20, 38),
+            (10, 28),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.7,
             (255, 255, 255),
@@ -234,17 +1502,98 @@ class CameraManager:
             cv2.LINE_AA
         )
         
-        return frame
+        return patch
+    
+    def _build_output_path(self, order_id: str, filename_suffix: str, timestamp: str) -> Path:
+        """Recording path for an order (storage.filename_format in the temp directory)"""
+        filename = self.storage_config['filename_format'].format(
+            order_id=order_id,
+            timestamp=timestamp
+        )
+        if filename_suffix:
+            filename = f"{Path(filename).stem}{filename_suffix}{Path(filename).suffix}"
+        return self.temp_dir / filename
+    
+    def _unique_timestamp(self, order_id: str, filename_suffix: str) -> str:
+        """
+        Filename timestamp (now) that no existing or in-flight file of the order uses
+        
+        Scanning an order again within the same second would otherwise
+        overwrite its previous recording; the timestamp moves on by a second.
+        """
+        moment = datetime.now()
+        while True:
+            timestamp = moment.strftime("%Y%m%d_%H%M%S")
+            output_path = str(self._build_output_path(order_id, filename_suffix, timestamp))
+            taken = [
+                path for path in (output_path, self._segment_path(1, output_path))
+                if Path(path).exists() or path in self._finalizing or path == self._active_path
+            ]
+            if not taken:
+                return timestamp
+            moment += timedelta(seconds=1)
     
-    def start_recording(self, order_id: str) -> Tuple[bool, Optional[str]]:
+    def _plan_crop(self) -> Tuple[Optional[Tuple[int, int, int, int]], Optional[dict]]:
+        """
+        Pixel crop for a recording starting now
+        
+        Returns:
+            Tuple of (crop rectangle, crop description for metadata), both
+            None when the full frame is recorded
+        """
+        source_width, source_height = self._capture_size()
+        crop = self._crop_rect(source_width, source_height)
+        if crop is None:
+            return None, None
+        
+        x, y, width, height = crop
+        logger.info(f"Recording ROI {width}x{height} at ({x}, {y}) of {source_width}x{source_height}")
+        return crop, {
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "source_width": source_width,
+            "source_height": source_height
+        }
+    
+    def _reset_timeline(self, start_time: float):
+        """Start a new recording timeline (called with _record_lock held)"""
+        self._timeline_start = start_time
+        self._capture_start = start_time  # Timeline may start earlier (pre-roll)
+        self._pre_roll_frames = 0
+        self._next_frame_index = 0
+        self._frames_in = 0
+        self._frames_out = 0
+        self._frames_duplicated = 0
+        self._frames_skipped = 0
+    
+    def start_recording(
+        self,
+        order_id: str,
+        filename_suffix: str = "",
+        timestamp: Optional[str] = None,
+        segment_callback: Optional[Callable[[str], None]] = None,
+        max_seconds: Optional[float] = None
+    ) -> Tuple[bool, Optional[str]]:
         """
         Start recording video
         
+        With recording.segment_seconds set, the recording is split into
+        _partNNN files; each finished part is passed to segment_callback
+        (on the capture thread) and the last one is returned by stop_recording.
+        
         Args:
             order_id: Order ID for filename
+            filename_suffix: Appended to the file name before the extension
+                (e.g. '_cam1' for additional cameras)
+            timestamp: Filename timestamp (default now), shared across cameras
+            segment_callback: Called with the path of each finished segment
+            max_seconds: Recording time limit for the disk space check
+                (None = recording.default_limit_seconds, 0 = no limit)
             
         Returns:
-            Tuple of (success, output_filepath)
+            Tuple of (success, output_filepath of the first file)
         """
         if self.cap is None or not self.cap.isOpened():
             logger.error("Camera not started")
@@ -254,59 +1603,290 @@ class CameraManager:
             logger.warning("Already recording")
             return False, None
         
+        if max_seconds is None:
+            max_seconds = float(self.config.get('recording', {}).get('default_limit_seconds', 0))
+        if not self.check_disk_space(max_seconds):
+            return False, None
+        
         try:
             # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = self.storage_config['filename_format'].format(
-                order_id=order_id,
-                timestamp=timestamp
-            )
-            output_path = self.temp_dir / filename
-            
-            # Setup video writer
-            fourcc = cv2.VideoWriter_fourcc(*self.camera_config['codec'])
-            self.writer = cv2.VideoWriter(
-                str(output_path),
-                fourcc,
-                self.camera_config['fps'],
-                (self.camera_config['recording_width'], self.camera_config['recording_height'])
-            )
+            if timestamp is None:
+                timestamp = self._unique_timestamp(order_id, filename_suffix)
+            output_path = self._build_output_path(order_id, filename_suffix, timestamp)
+            self.current_output_path = str(output_path)
             
-            if not self.writer.isOpened():
-                logger.error("Failed to create video writer")
-                return False, None
+            segmented = self.segment_seconds > 0
+            first_path = self._segment_path(1) if segmented else str(output_path)
             
-            # No need to change resolution - already at 1920x1080
+            # Crop is fixed for the whole recording (all segments share one size)
+            self._recording_crop, self.last_recording_crop = self._plan_crop()
+            self.pending_rename = None
             
-            self.is_recording = True
-            self.current_output_path = str(output_path)
-            logger.info(f"Recording started: {output_path}")
+            with self._record_lock:
+                self._reset_timeline(time.monotonic())
+                
+                # Frames from before the scan are written first
+                start_time = self._timeline_start
+                self._timeline_start, pre_roll = self._take_pre_roll(start_time)
+                
+                self.encoder = self._create_encoder(first_path, self._recording_crop, preload=pre_roll)
+                if self.encoder is None:
+                    return False, None
+                self._recording_encoders = [self.encoder]
+                
+                # Pre-roll frames count toward the first segment
+                self._active_path = first_path
+                self.recording_segments = [first_path]
+                self._segment_callback = segment_callback
+                self._segment_frames = int(round(self.segment_seconds * self.camera_config['fps'])) if segmented else 0
+                self._segment_written = len(pre_roll)
+                self.recording_timestamp = timestamp
+                self.is_recording = True
+            
+            if pre_roll:
+                logger.info(f"Pre-roll: {len(pre_roll)} frames ({start_time - self._timeline_start:.1f}s before start)")
+            if segmented:
+                logger.info(f"Recording started: {output_path} ({self.segment_seconds:g}s segments)")
+            else:
+                logger.info(f"Recording started: {output_path}")
             
-            return True, str(output_path)
+            self._prepare_standby_async()
+            self._prepare_next_segment_async()
+            return True, first_path
             
         except Exception as e:
             logger.error(f"Error starting recording: {str(e)}")
             return False, None
     
+    def switch_recording(
+        self,
+        order_id: str,
+        filename_suffix: str = "",
+        timestamp: Optional[str] = None,
+        segment_callback: Optional[Callable[[str], None]] = None,
+        max_seconds: Optional[float] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Hand the running recording over to another order without a gap
+        
+        The writers are swapped under the record lock, so the last frame of
+        the current file is immediately followed by the first frame of the
+        new one. The new recording takes over the standby writer (opened in
+        advance; its file is renamed when finalized). Without a usable
+        standby writer one is opened while the capture thread waits; the
+        constant frame rate timeline fills that wait.
+        
+        Args:
+            order_id: Order ID of the new recording
+            filename_suffix: Appended to the file name before the extension
+            timestamp: Filename timestamp (default now), shared across cameras
+            segment_callback: Called with each finished segment of the new recording
+            max_seconds: Recording time limit for the disk space check
+                (None = recording.default_limit_seconds, 0 = no limit)
+            
+        Returns:
+            Tuple of (finished file of the current recording, first file of
+            the new one); (None, None) if the switch failed and the current
+            recording continues
+        """
+        if not self.is_recording:
+            logger.warning("Not recording - nothing to switch")
+            return None, None
+        
+        if max_seconds is None:
+            max_seconds = float(self.config.get('recording', {}).get('default_limit_seconds', 0))
+        if not self.check_disk_space(max_seconds):
+            return None, None
+        
+        try:
+            if timestamp is None:
+                timestamp = self._unique_timestamp(order_id, filename_suffix)
+            output_path = str(self._build_output_path(order_id, filename_suffix, timestamp))
+            
+            segmented = self.segment_seconds > 0
+            first_path = self._segment_path(1, output_path) if segmented else output_path
+            
+            crop, crop_info = self._plan_crop()
+            standby = self._take_standby(crop)
+            
+            with self._record_lock:
+                if not self.is_recording:
+                    logger.warning("Recording stopped during switch")
+                    if standby is not None:
+                        self._discard_encoder(*standby)
+                    return None, None
+                
+                if standby is not None:
+                    standby_path, encoder = standby
+                    encoder.rename_to = (standby_path, first_path)
+                else:
+                    encoder = self._create_encoder(first_path, crop)
+                    if encoder is None:
+                        return None, None
+                
+                # Finish the current file on this frame boundary
+                switch_time = time.monotonic()
+                finished_path = self._active_path
+                finished_encoder = self.encoder
+                self.last_recording_stats = self._build_recording_stats(switch_time)
+                self._keep_frame_stats(finished_path)
+                
+                self.encoder = encoder
+                self._recording_encoders = [encoder]
+                self.pending_rename = encoder.rename_to
+                self._recording_crop = crop
+                self.last_recording_crop = crop_info
+                self._reset_timeline(switch_time)
+                self.current_output_path = output_path
+                self._active_path = first_path
+                self.recording_segments = [first_path]
+                self._segment_callback = segment_callback
+                self._segment_frames = int(round(self.segment_seconds * self.camera_config['fps'])) if segmented else 0
+                self._segment_written = 0
+                self.recording_timestamp = timestamp
+            
+            self._finish_encoder(finished_path, finished_encoder)
+            self._log_recording_stats()
+            logger.info(
+                f"Recording switched: {finished_path} -> {first_path}"
+                f"{' (standby writer)' if standby is not None else ''}"
+            )
+            
+            self._discard_next_segment()
+            self._prepare_standby_async()
+            self._prepare_next_segment_async()
+            return finished_path, first_path
+            
+        except Exception as e:
+            logger.error(f"Error switching recording: {str(e)}")
+            return None, None
+    
+    def _prepare_standby(self):
+        """Open the standby writer for the next switch if there is none"""
+        with self._standby_lock:
+            if self._standby is not None or not self.is_recording:
+                return
+            
+            crop = self._recording_crop
+            suffix = Path(self.current_output_path).suffix
+            path = self.temp_dir / f"{self.STANDBY_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{suffix}"
+            encoder = self._create_encoder(str(path), crop)
+            if encoder is not None:
+                self._standby = (str(path), encoder, crop)
+                logger.debug(f"Standby writer ready: {path.name}")
+    
+    def _prepare_standby_async(self):
+        """Open the standby writer on a background thread (opening can take a while)"""
+        if self.standby_enabled:
+            threading.Thread(target=self._prepare_standby, daemon=True).start()
+    
+    def _take_standby(
+        self,
+        crop: Optional[Tuple[int, int, int, int]]
+    ) -> Optional[Tuple[str, AsyncEncoder]]:
+        """
+        Take the standby writer for a new recording
+        
+        Args:
+            crop: Crop of the new recording (the writer's frame size must match)
+            
+        Returns:
+            Tuple of (temporary path, encoder) or None if no usable writer is ready
+        """
+        with self._standby_lock:
+            standby, self._standby = self._standby, None
+        
+        if standby is None:
+            return None
+        
+        path, encoder, standby_crop = standby
+        if standby_crop != crop:
+            # ROI changed since the writer was opened
+            self._discard_encoder(path, encoder)
+            return None
+        return path, encoder
+    
+    def _discard_standby(self):
+        """Close an unused standby writer and delete its file"""
+        with self._standby_lock:
+            standby, self._standby = self._standby, None
+        
+        if standby is not None:
+            self._discard_encoder(standby[0], standby[1])
+    
+    def _discard_encoder(self, path: str, encoder: AsyncEncoder):
+        """Close an encoder that has no frames and delete its file (background thread)"""
+        encoder.close()
+        
+        def remove():
+            encoder.wait(10)
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not delete unused standby file {path}: {str(e)}")
+        
+        threading.Thread(target=remove, daemon=True).start()
+    
+    def _finish_encoder(self, output_path: str, encoder: Optional[AsyncEncoder]):
+        """Close a recording's encoder; it finalizes the file in the background"""
+        if encoder is None:
+            return
+        
+        # Use wait_for_recording() before reading the file
+        encoder.close()
+        self._finalizing[output_path] = encoder
+        self.last_encoder_stats = encoder.get_stats()
+        if encoder.frames_dropped:
+            logger.warning(
+                f"Encoder dropped {encoder.frames_dropped} of "
+                f"{encoder.frames_submitted} frames ({encoder.policy})"
+            )
+    
+    def _log_recording_stats(self):
+        """Log frame timing of the last finished recording"""
+        stats = self.last_recording_stats
+        logger.info(
+            f"Recording timing ({stats['mode']} @ {stats['fps']} fps): "
+            f"{stats['frames_in']} captured, {stats['frames_out']} written, "
+            f"{stats['frames_duplicated']} duplicated, {stats['frames_skipped']} skipped, "
+            f"drift {stats['timing_drift']:+.3f}s"
+        )
+        pool_stats = self.frame_pool.get_stats()
+        logger.debug(
+            f"Frame pool: {pool_stats['hits']} hits, {pool_stats['misses']} misses, "
+            f"{pool_stats['idle_buffers']} idle ({pool_stats['idle_mb']} MB)"
+        )
+    
     def stop_recording(self) -> Optional[str]:
         """
         Stop recording video
         
         Returns:
-            Path to recorded video file or None
+            Path to recorded video file (last segment if segmented) or None
         """
         if not self.is_recording:
             logger.warning("Not recording")
             return None
         
         try:
-            output_path = self.current_output_path
+            # Wait for an in-flight write from the capture thread
+            with self._record_lock:
+                self.is_recording = False
+                output_path = self._active_path
+                encoder = self.encoder
+                self.encoder = None
+                self._recording_crop = None
+                self._segment_callback = None
+                self.last_recording_stats = self._build_recording_stats(time.monotonic())
+                self._keep_frame_stats(output_path)
             
-            if self.writer is not None:
-                self.writer.release()
-                self.writer = None
+            # Encoder drains its queue and releases the writer in the background
+            self._finish_encoder(output_path, encoder)
+            self._log_recording_stats()
             
-            self.is_recording = False
+            # Not needed until the next recording starts
+            self._discard_standby()
+            self._discard_next_segment()
             
             # No need to change resolution - preview and recording use same resolution
             
@@ -328,25 +1908,57 @@ class CameraManager:
         Returns:
             True if successful
         """
-        if not self.is_recording or self.writer is None:
+        encoder = self.encoder
+        if not self.is_recording or encoder is None:
             return False
         
-        try:
-            # Resize frame to recording resolution if needed
-            h, w = frame.shape[:2]
-            target_w = self.camera_config['recording_width']
-            target_h = self.camera_config['recording_height']
-            
-            if w != target_w or h != target_h:
-                frame = cv2.resize(frame, (target_w, target_h))
+        # Queued for the encoder thread (resize and write happen there);
+        # returns False if the frame was dropped by the backpressure policy
+        return encoder.submit(frame)
+    
+    def wait_for_recording(self, output_path: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a stopped recording has been fully written to disk
+        
+        Args:
+            output_path: Path returned by stop_recording
+            timeout: Maximum seconds to wait (None waits indefinitely)
             
-            # Write original orientation (no flip) to video file
-            self.writer.write(frame)
+        Returns:
+            True if the file is finalized and safe to read
+        """
+        encoder = self._finalizing.get(output_path)
+        if encoder is None:
             return True
-            
-        except Exception as e:
-            logger.error(f"Error writing frame: {str(e)}")
+        
+        if not encoder.wait(timeout):
+            logger.warning(f"Recording still finalizing: {output_path}")
             return False
+        
+        self._finalizing.pop(output_path, None)
+        logger.info(f"Recording finalized: {output_path} ({encoder.frames_written} frames)")
+        return True
+    
+    def get_encoder_stats(self) -> Optional[dict]:
+        """
+        Get counters of the active encoder (or the last stopped one)
+        
+        Returns:
+            Dictionary with submitted/written/dropped counters and queue depth
+        """
+        encoder = self.encoder
+        if encoder is not None:
+            return encoder.get_stats()
+        return self.last_encoder_stats
+    
+    def get_frame_pool_stats(self) -> dict:
+        """
+        Get frame buffer pool counters
+        
+        Returns:
+            Dictionary with hits, misses, hit_rate and idle buffers
+        """
+        return self.frame_pool.get_stats()
     
     def _apply_camera_settings(self):
         """Apply camera quality settings (hardware level - may not work on all cameras)"""
@@ -363,31 +1975,75 @@ class CameraManager:
     def _apply_image_adjustments(self, frame: np.ndarray) -> np.ndarray:
         """Apply camera settings as image processing
         
+        All settings are applied in one in-place pass, so the cost per
+        frame does not grow with the number of controls.
+        
         Args:
-            frame: Input frame
+            frame: Input frame (modified in place)
             
         Returns:
             Adjusted frame
         """
-        # Apply brightness (shift pixel values)
-        if self.brightness != 50:
-            # Map 0-100 to -50 to +50
-            brightness_value = int((self.brightness - 50) * 1.0)
-            if brightness_value != 0:
-                frame = cv2.convertScaleAbs(frame, alpha=1, beta=brightness_value)
+        adjustment = self._adjustment
+        if adjustment is None:
+            return frame
+        
+        operation, operand = adjustment
+        if operation == 'lut':
+            cv2.LUT(frame, operand, dst=frame)
+        elif operation == 'add':
+            # Saturating SIMD add is cheaper than a table lookup for a plain shift
+            cv2.add(frame, operand, dst=frame)
+        else:
+            cv2.subtract(frame, operand, dst=frame)
         
         return frame
     
+    def _rebuild_adjustment_lut(self):
+        """Compile brightness, contrast and gamma into a lookup table"""
+        values = np.arange(256, dtype=np.float32)
+        
+        # Contrast: 0-100 maps to 0x-2x around mid-gray (50 = unchanged)
+        if self.contrast != 50:
+            values = (values - 128.0) * (self.contrast / 50.0) + 128.0
+        
+        # Brightness: map 0-100 to -50 to +50 (shift pixel values)
+        brightness_value = int((self.brightness - 50) * 1.0)
+        if brightness_value != 0:
+            values = values + brightness_value
+        
+        # Gamma: percent, 100 = unchanged, >100 brightens midtones
+        if self.gamma != 100 and self.gamma > 0:
+            values = 255.0 * np.power(np.clip(values, 0, 255) / 255.0, 100.0 / self.gamma)
+        
+        lut = np.clip(np.rint(values), 0, 255).astype(np.uint8)
+        
+        if np.array_equal(lut, np.arange(256, dtype=np.uint8)):
+            self._adjustment = None
+        elif self.contrast == 50 and self.gamma == 100:
+            shift = float(abs(brightness_value))
+            scalar = (shift, shift, shift, 0.0)
+            self._adjustment = ('add' if brightness_value > 0 else 'subtract', scalar)
+        else:
+            self._adjustment = ('lut', lut)
+    
     def update_camera_setting(self, setting: str, value: int):
         """
         Update camera setting in real-time
         
         Args:
-            setting: Setting name ('brightness', 'flip_horizontal')
-            value: Value (0-100 for brightness)
+            setting: Setting name ('brightness', 'contrast', 'gamma', 'flip_horizontal')
+            value: Value (0-100 for brightness/contrast, percent for gamma)
         """
         if setting == 'brightness':
             self.brightness = value
+            self._rebuild_adjustment_lut()
+        elif setting == 'contrast':
+            self.contrast = value
+            self._rebuild_adjustment_lut()
+        elif setting == 'gamma':
+            self.gamma = value
+            self._rebuild_adjustment_lut()
         elif setting == 'flip_horizontal':
             self.flip_horizontal = bool(value)
         
@@ -0,0 +1,580 @@
+"""
+Capture Process Module - Runs capture and encoding in a separate process
+A worker process owns the CameraManager (camera, adjustments, encoder) so the
+video path does not share the GIL with the UI. Commands travel over a pipe;
+preview frames are published through shared memory without pickling.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+from .logger import setup_logger
+
+logger = setup_logger("CaptureProcess")
+
+# Shared memory layout: int64 header [sequence, width, height, camera_open]
+# followed by one BGR preview frame. The sequence is odd while the worker
+# writes a frame (seqlock), so readers can detect a torn frame.
+HEADER_FIELDS = 4
+HEADER_BYTES = HEADER_FIELDS * 8
+
+# CameraManager methods the worker accepts over the pipe
+COMMANDS = {
+    "start_camera",
+    "stop_camera",
+    "start_recording",
+    "switch_recording",
+    "stop_recording",
+    "wait_for_recording",
+    "list_available_cameras",
+    "update_camera_setting",
+    "set_roi",
+    "get_recording_crop",
+    "get_recording_stats",
+    "get_frame_stats",
+    "get_encoder_stats",
+    "get_frame_pool_stats",
+    "get_capture_mode",
+    "set_external_camera",
+    "set_preview_display_size",
+}
+
+
+def _worker_state(manager) -> dict:
+    """Snapshot of manager attributes mirrored by the client"""
+    return {
+        "is_recording": manager.is_recording,
+        "current_camera_index": manager.current_camera_index,
+        "current_output_path": manager.current_output_path,
+        "recording_timestamp": manager.recording_timestamp,
+        "recording_segments": list(manager.recording_segments),
+        "pending_rename": manager.pending_rename,
+        "brightness": manager.brightness,
+        "contrast": manager.contrast,
+        "gamma": manager.gamma,
+        "flip_horizontal": manager.flip_horizontal,
+        "roi": manager.roi,
+        "disk_space_low": manager.disk_space_low,
+    }
+
+
+def _publish_previews(manager, shm: shared_memory.SharedMemory, stop_event: threading.Event):
+    """Worker thread copying each new preview frame into shared memory"""
+    header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+    capacity = shm.size - HEADER_BYTES
+    last_seq = -1
+    
+    try:
+        while not stop_event.is_set():
+            header[3] = 1 if manager.is_camera_open() else 0
+            
+            seq = manager.frame_sequence
+            if seq != last_seq:
+                last_seq = seq
+                frame = manager.get_preview_frame()
+                if frame is not None and frame.nbytes <= capacity:
+                    height, width = frame.shape[:2]
+                    header[0] += 1  # Odd: frame being written
+                    header[1] = width
+                    header[2] = height
+                    target = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf, offset=HEADER_BYTES)
+                    np.copyto(target, frame)
+                    del target
+                    header[0] += 1  # Even: frame complete
+            
+            time.sleep(0.01)
+    finally:
+        header[3] = 0
+        del header
+
+
+def _execute(manager, message: dict, send: Callable[[dict], None]):
+    """Run one command from the client and send the reply"""
+    command = message["command"]
+    args = message.get("args", ())
+    kwargs = dict(message.get("kwargs", {}))
+    reply = {"id": message["id"]}
+    
+    try:
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+        
+        if command == "set_preview_display_size":
+            manager.preview_display_size = tuple(args[0])
+            result = None
+        else:
+            if command in ("start_recording", "switch_recording") and kwargs.pop("segment_events", False):
+                # Finished segments are reported back as events
+                kwargs["segment_callback"] = lambda path: send({"event": "segment", "path": path})
+            result = getattr(manager, command)(*args, **kwargs)
+        
+        reply["result"] = result
+    except Exception as e:
+        logger.error(f"Command {command} failed: {str(e)}")
+        reply["error"] = str(e)
+    
+    reply["state"] = _worker_state(manager)
+    send(reply)
+
+
+def run_capture_worker(conn, shm_name: str, config_path: Optional[str] = None):
+    """
+    Entry point of the capture worker process
+    
+    Args:
+        conn: Pipe end for commands (in) and replies/events (out)
+        shm_name: Name of the preview shared memory block
+        config_path: Path to config.yaml file
+    """
+    from .camera_manager import CameraManager
+    
+    # Created and unlinked by the GUI process; only attached here
+    shm = shared_memory.SharedMemory(name=shm_name)
+    
+    manager = CameraManager(config_path)
+    send_lock = threading.Lock()
+    
+    def send(message: dict):
+        with send_lock:
+            conn.send(message)
+    
+    stop_event = threading.Event()
+    publisher = threading.Thread(target=_publish_previews, args=(manager, shm, stop_event), daemon=True)
+    publisher.start()
+    logger.info(f"Capture worker started (pid {os.getpid()})")
+    
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            logger.warning("GUI process disconnected - stopping capture worker")
+            break
+        
+        if message.get("command") == "exit":
+            break
+        
+        # Commands run concurrently (e.g. wait_for_recording must not block stop_recording)
+        threading.Thread(target=_execute, args=(manager, message, send), daemon=True).start()
+    
+    # stop_camera also finalizes recordings still being written
+    manager.stop_camera()
+    stop_event.set()
+    publisher.join(timeout=2)
+    shm.close()
+    conn.close()
+    logger.info("Capture worker stopped")
+
+
+class CameraProcessClient:
+    """GUI-side proxy for a CameraManager running in the capture worker process
+    
+    Mirrors the CameraManager methods used by the main window, so either can
+    be used as the window's camera manager.
+    """
+    
+    def __init__(self, config_path: Optional[str] = None):
+        """
+        Start the capture worker process
+        
+        Args:
+            config_path: Path to config.yaml file
+        """
+        if config_path is None:
+            from .resource_path import get_resource_path
+            config_path = get_resource_path("config/config.yaml")
+        
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+        
+        self.camera_config = self.config['camera']
+        self.storage_config = self.config['storage']
+        self.segment_seconds = float(self.config.get('recording', {}).get('segment_seconds', 0))
+        self.shared_cameras: Dict[int, object] = {}
+        
+        # Mirrored from the worker with every reply
+        self.is_recording = False
+        self.current_camera_index = 0
+        self.current_output_path: Optional[str] = None
+        self.recording_timestamp: Optional[str] = None
+        self.recording_segments: List[str] = []
+        self.pending_rename: Optional[Tuple[str, str]] = None
+        self.brightness = self.camera_config.get('brightness', 50)
+        self.contrast = self.camera_config.get('contrast', 50)
+        self.gamma = self.camera_config.get('gamma', 100)
+        self.flip_horizontal = self.camera_config.get('flip_horizontal', False)
+        self.roi: Optional[Tuple[float, float, float, float]] = None
+        self.disk_space_low = False
+        
+        self._preview_display_size = (
+            int(self.camera_config.get('preview_display_width', 640)),
+            int(self.camera_config.get('preview_display_height', 360))
+        )
+        
+        # Previews are never upscaled, so a full capture frame is the upper bound
+        max_width = max(self.camera_config['preview_width'], self.camera_config['recording_width'])
+        max_height = max(self.camera_config['preview_height'], self.camera_config['recording_height'])
+        self._shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + max_width * max_height * 3)
+        self._header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        self._header[:] = 0
+        self._preview_frame: Optional[np.ndarray] = None  # Last complete frame (returned to the caller)
+        self._preview_scratch: Optional[np.ndarray] = None  # Copy target, swapped in once verified
+        self._preview_seq = 0
+        
+        # Request/reply bookkeeping (id -> [event, reply])
+        self._pending: Dict[int, list] = {}
+        self._send_lock = threading.Lock()
+        self._next_id = 0
+        self._segment_callback: Optional[Callable[[str], None]] = None
+        self._enumerating = False
+        self._closing = False
+        
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=run_capture_worker,
+            args=(child_conn, self._shm.name, str(config_path)),
+            name="CaptureWorker",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+        logger.info(f"Capture worker process started (pid {self._process.pid})")
+    
+    def _call(self, command: str, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Send a command to the worker and wait for its reply
+        
+        Args:
+            command: CameraManager method name
+            timeout: Maximum seconds to wait (None waits until the worker replies or exits)
+        
+        Returns:
+            Command result or None if it failed
+        """
+        if not self._process.is_alive():
+            logger.error(f"Capture worker is not running ({command})")
+            return None
+        
+        event = threading.Event()
+        with self._send_lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._pending[request_id] = [event, None]
+            try:
+                self._conn.send({"id": request_id, "command": command, "args": args, "kwargs": kwargs})
+            except (OSError, ValueError) as e:
+                self._pending.pop(request_id, None)
+                logger.error(f"Failed to send {command} to capture worker: {str(e)}")
+                return None
+        
+        if not event.wait(timeout):
+            self._pending.pop(request_id, None)
+            logger.error(f"Capture worker did not answer {command} within {timeout}s")
+            return None
+        
+        reply = self._pending.pop(request_id)[1]
+        if reply is None or "error" in reply:
+            return None
+        
+        self._apply_state(reply["state"])
+        return reply["result"]
+    
+    def _apply_state(self, state: dict):
+        """Update mirrored attributes from a worker state snapshot"""
+        for name, value in state.items():
+            setattr(self, name, value)
+    
+    def _listen(self):
+        """Background thread receiving replies and events from the worker"""
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            
+            if message.get("event") == "segment":
+                callback = self._segment_callback
+                if callback is not None:
+                    try:
+                        callback(message["path"])
+                    except Exception as e:
+                        logger.error(f"Segment callback failed: {str(e)}")
+                continue
+            
+            pending = self._pending.get(message.get("id"))
+            if pending is not None:
+                pending[1] = message
+                pending[0].set()
+        
+        # Worker exited: release every waiting caller
+        if not self._closing:
+            logger.error("Capture worker exited unexpectedly")
+        for pending in list(self._pending.values()):
+            pending[0].set()
+    
+    @property
+    def preview_display_size(self) -> Tuple[int, int]:
+        """Preview frame bounding box (width, height)"""
+        return self._preview_display_size
+    
+    @preview_display_size.setter
+    def preview_display_size(self, size: Tuple[int, int]):
+        self._preview_display_size = (int(size[0]), int(size[1]))
+        self._call("set_preview_display_size", self._preview_display_size, timeout=5)
+    
+    def is_camera_open(self) -> bool:
+        """Check if the worker has a camera opened"""
+        return bool(self._header[3])
+    
+    def start_camera(self, camera_index: int = 0) -> bool:
+        """Start camera in the worker (see CameraManager.start_camera)"""
+        return bool(self._call("start_camera", camera_index))
+    
+    def stop_camera(self):
+        """Stop camera in the worker (see CameraManager.stop_camera)"""
+        self._call("stop_camera")
+    
+    def list_available_cameras(self, max_test: int = 3) -> List[Tuple[int, str]]:
+        """Enumerate cameras in the worker (see CameraManager.list_available_cameras)"""
+        return [tuple(camera) for camera in (self._call("list_available_cameras", max_test) or [])]
+    
+    def list_available_cameras_async(
+        self,
+        callback: Callable[[List[Tuple[int, str]]], None],
+        max_test: int = 3
+    ) -> bool:
+        """Enumerate cameras on a background thread (see CameraManager.list_available_cameras_async)"""
+        if self._enumerating:
+            return False
+        self._enumerating = True
+        
+        def scan():
+            try:
+                cameras = self.list_available_cameras(max_test)
+            finally:
+                self._enumerating = False
+            callback(cameras)
+        
+        threading.Thread(target=scan, daemon=True).start()
+        return True
+    
+    def start_recording(
+        self,
+        order_id: str,
+        filename_suffix: str = "",
+        timestamp: Optional[str] = None,
+        segment_callback: Optional[Callable[[str], None]] = None,
+        max_seconds: Optional[float] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Start recording in the worker (see CameraManager.start_recording)"""
+        self._segment_callback = segment_callback
+        result = self._call(
+            "start_recording",
+            order_id,
+            filename_suffix=filename_suffix,
+            timestamp=timestamp,
+            segment_events=segment_callback is not None,
+            max_seconds=max_seconds
+        )
+        if not result:
+            return False, None
+        return tuple(result)
+    
+    def switch_recording(
+        self,
+        order_id: str,
+        filename_suffix: str = "",
+        timestamp: Optional[str] = None,
+        segment_callback: Optional[Callable[[str], None]] = None,
+        max_seconds: Optional[float] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Switch the worker's recording to another order (see CameraManager.switch_recording)"""
+        result = self._call(
+            "switch_recording",
+            order_id,
+            filename_suffix=filename_suffix,
+            timestamp=timestamp,
+            segment_events=segment_callback is not None,
+            max_seconds=max_seconds
+        )
+        if not result or result[1] is None:
+            return None, None
+        
+        # Segments of the previous recording were all reported before the switch
+        self._segment_callback = segment_callback
+        return tuple(result)
+    
+    def stop_recording(self) -> Optional[str]:
+        """Stop recording in the worker (see CameraManager.stop_recording)"""
+        return self._call("stop_recording")
+    
+    def wait_for_recording(self, output_path: str, timeout: Optional[float] = None) -> bool:
+        """Wait for a recording to be finalized (see CameraManager.wait_for_recording)"""
+        return bool(self._call("wait_for_recording", output_path, timeout))
+    
+    def update_camera_setting(self, setting: str, value):
+        """Change an image setting in the worker (see CameraManager.update_camera_setting)"""
+        self._call("update_camera_setting", setting, value, timeout=5)
+    
+    def set_roi(self, roi):
+        """Set the recording ROI in the worker (see CameraManager.set_roi)"""
+        self._call("set_roi", roi, timeout=5)
+    
+    def get_recording_crop(self) -> Optional[dict]:
+        """Crop of the current or last recording"""
+        return self._call("get_recording_crop", timeout=5)
+    
+    def get_recording_stats(self) -> Optional[dict]:
+        """Timing statistics of the last stopped recording"""
+        return self._call("get_recording_stats", timeout=5)
+    
+    def get_frame_stats(self, output_path: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Frame counters of a stopped recording (see CameraManager.get_frame_stats)"""
+        return self._call("get_frame_stats", output_path, timeout)
+    
+    def get_encoder_stats(self) -> Optional[dict]:
+        """Counters of the active or last encoder"""
+        return self._call("get_encoder_stats", timeout=5)
+    
+    def get_frame_pool_stats(self) -> Optional[dict]:
+        """Frame buffer pool counters of the worker"""
+        return self._call("get_frame_pool_stats", timeout=5)
+    
+    def share_camera(self, index: int, camera):
+        """
+        Register a camera opened in this process (multi-camera) with the
+        worker, so its camera scans never open that device
+        
+        Args:
+            index: Camera index
+            camera: CameraManager holding the device
+        """
+        self.shared_cameras[index] = camera
+        self._call("set_external_camera", index, camera.get_capture_mode() or {}, timeout=5)
+    
+    def unshare_camera(self, index: int):
+        """Forget a camera registered with share_camera()"""
+        if self.shared_cameras.pop(index, None) is not None:
+            self._call("set_external_camera", index, None, timeout=5)
+    
+    def get_capture_mode(self) -> Optional[dict]:
+        """Negotiated capture mode of the worker's camera"""
+        return self._call("get_capture_mode", timeout=5)
+    
+    def get_preview_frame(self, copy: bool = False) -> Optional[np.ndarray]:
+        """
+        Get newest preview frame published by the worker
+        
+        Args:
+            copy: Return a new array owned by the caller. The default reuses
+                one set of buffers and must only be called from one thread
+                (the Tk preview); other threads pass copy=True
+        
+        Returns:
+            BGR frame (reused buffer unless copy) or None before the first frame
+        """
+        if copy:
+            # A torn read is retried; the worker rewrites the frame only
+            # a few times per second
+            for _ in range(3):
+                frame, _ = self._read_preview(None)
+                if frame is not None:
+                    return frame
+            return None
+        
+        seq = int(self._header[0])
+        if seq == self._preview_seq or seq % 2:
+            # Unchanged, or the worker is mid-write: keep the last complete frame
+            return self._preview_frame
+        
+        frame, seq = self._read_preview(self._preview_scratch)
+        if frame is None:
+            # Worker started another frame meanwhile; the copy is torn
+            return self._preview_frame
+        
+        self._preview_scratch, self._preview_frame = self._preview_frame, frame
+        self._preview_seq = seq
+        return self._preview_frame
+    
+    def _read_preview(self, target: Optional[np.ndarray]) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Copy the published frame out of shared memory
+        
+        Args:
+            target: Buffer to copy into (replaced if missing or mis-sized)
+        
+        Returns:
+            (frame, sequence), frame None if no complete frame could be read
+        """
+        seq = int(self._header[0])
+        width, height = int(self._header[1]), int(self._header[2])
+        if seq == 0 or seq % 2 or width <= 0 or height <= 0:
+            return None, seq
+        
+        if target is None or target.shape[:2] != (height, width):
+            target = np.empty((height, width, 3), dtype=np.uint8)
+        
+        source = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self._shm.buf, offset=HEADER_BYTES)
+        np.copyto(target, source)
+        del source
+        
+        # Only accept the frame if the worker did not start another one meanwhile
+        if int(self._header[0]) != seq:
+            return None, seq
+        return target, seq
+    
+    def shutdown(self, timeout: float = 10.0):
+        """
+        Stop the worker process (finishes pending recordings) and free shared memory
+        
+        Args:
+            timeout: Seconds to wait for the worker before terminating it
+        """
+        self._closing = True
+        try:
+            with self._send_lock:
+                self._conn.send({"command": "exit"})
+        except (OSError, ValueError):
+            pass
+        
+        self._process.join(timeout)
+        if self._process.is_alive():
+            logger.warning("Capture worker did not exit - terminating")
+            self._process.terminate()
+            self._process.join(2)
+        
+        del self._header
+        self._preview_frame = None
+        self._preview_scratch = None
+        self._shm.close()
+        self._shm.unlink()
+        logger.info("Capture worker process stopped")
+
+
+if __name__ == "__main__":
+    # Test capture process: preview frames over shared memory + a short recording
+    client = CameraProcessClient()
+    
+    if client.start_camera(0):
+        time.sleep(1)
+        frame = client.get_preview_frame()
+        print(f"Preview frame: {None if frame is None else frame.shape}")
+        
+        success, path = client.start_recording("TEST_PROCESS")
+        time.sleep(3)
+        path = client.stop_recording()
+        client.wait_for_recording(path)
+        print(f"Recorded: {path}")
+        print(f"Stats: {client.get_recording_stats()}")
+    
+    client.shutdown()
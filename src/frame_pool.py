@@ -0,0 +1,108 @@
+"""
+Frame Pool Module - Reusable frame buffers
+Recycles fixed-shape numpy arrays so the per-frame path (capture -> encoder)
+does not allocate a new multi-megabyte array for every frame
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .logger import setup_logger
+
+logger = setup_logger("FramePool")
+
+
+class FramePool:
+    """Thread-safe free list of frame buffers, keyed by shape and dtype"""
+    
+    def __init__(self, max_free: int = 8):
+        """
+        Initialize Frame Pool
+        
+        Args:
+            max_free: Maximum idle buffers kept per shape (extra ones are freed)
+        """
+        self.max_free = max(0, max_free)
+        
+        # Counters
+        self.hits = 0  # acquire() served from the free list
+        self.misses = 0  # acquire() had to allocate
+        self.discarded = 0  # release() over max_free, left to the GC
+        
+        self._free: Dict[Tuple, List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Get a buffer (contents undefined)
+        
+        Args:
+            shape: Array shape, e.g. (1080, 1920, 3)
+            dtype: Array dtype
+        
+        Returns:
+            Buffer to fill; hand it back with release() when done
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.hits += 1
+                return free.pop()
+            self.misses += 1
+        
+        return np.empty(shape, dtype=dtype)
+    
+    def copy(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Copy a frame into a pooled buffer
+        
+        Args:
+            frame: Source frame
+        
+        Returns:
+            Pooled copy of the frame
+        """
+        buffer = self.acquire(frame.shape, frame.dtype)
+        np.copyto(buffer, frame)
+        return buffer
+    
+    def release(self, buffer: np.ndarray):
+        """
+        Return a buffer to the pool (caller must not use it afterwards)
+        
+        Args:
+            buffer: Buffer from acquire() or copy()
+        """
+        key = (buffer.shape, buffer.dtype.str)
+        
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_free:
+                free.append(buffer)
+            else:
+                self.discarded += 1
+    
+    def clear(self):
+        """Drop all idle buffers (e.g. after a resolution change)"""
+        with self._lock:
+            self._free.clear()
+    
+    def get_stats(self) -> dict:
+        """Get pool counters"""
+        with self._lock:
+            idle = sum(len(free) for free in self._free.values())
+            idle_bytes = sum(b.nbytes for free in self._free.values() for b in free)
+        
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            "idle_buffers": idle,
+            "idle_mb": round(idle_bytes / 1024 / 1024, 1)
+        }
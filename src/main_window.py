@@ -5,20 +5,28 @@ Provides interface for camera preview, scanner input, and recording control
 
 import customtkinter as ctk
 from tkinter import messagebox
-import cv2
-from PIL import Image, ImageTk
+from PIL import Image, ImageDraw, ImageTk
 import threading
 import os
+import time
+import warnings
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import yaml
 import pygame
 
 from .camera_manager import CameraManager
+from .capture_process import CameraProcessClient
+from .multi_camera import MultiCameraRecorder
+from .segment_uploader import SegmentUploader
 from .scanner_manager import ScannerManager
+from .vision_scanner import VisionScanner
 from .b2_uploader import B2Uploader
 from .api_client import APIClient
 from .metadata_manager import MetadataManager
+from .post_processor import PostProcessor
+from .recording_session import RecordingSession
+from .recovery_manager import RecoveryManager
 from .updater import Updater
 from .dynamic_qr import DynamicQRGenerator
 from .logger import setup_logger
@@ -69,28 +77,53 @@ class MainWindow(ctk.CTk):
         
         # Initialize managers as None - will be loaded later
         self.camera_manager = None
+        self.multi_camera: Optional[MultiCameraRecorder] = None
         self.scanner_manager = None
+        self.vision_scanner: Optional[VisionScanner] = None
         self.b2_uploader = None
         self.api_client = None
         self.metadata_manager = None
+        self.recovery_manager: Optional[RecoveryManager] = None
+        self.recording_session: Optional[RecordingSession] = None
+        self.post_processor: Optional[PostProcessor] = None
         
         # State variables
         self.is_recording = False
         self.current_video_path: Optional[str] = None
+        self.secondary_video_paths: List[str] = []  # Extra camera files of the current recording
+        self.segment_uploader: Optional[SegmentUploader] = None  # Uploads segments during recording
         self.current_recording_order: Optional[str] = None
         self.update_preview_running = False
+        self.preview_image: Optional[Image.Image] = None  # Reused PIL image for the preview
+        self.preview_photo: Optional[ImageTk.PhotoImage] = None  # Reused Tk image for the preview
+        self.roi_drag_start: Optional[Tuple[float, float]] = None  # Normalized preview point where an ROI drag began
+        self.roi_drag_rect: Optional[Tuple[float, float, float, float]] = None  # ROI being dragged (preview orientation)
+        
+        # Adaptive preview rate: recording and encoder backlog slow the preview down
+        camera_config = self.config['camera']
+        self.preview_max_fps = float(camera_config.get('preview_fps', 30))
+        self.preview_recording_fps = float(camera_config.get('preview_recording_fps', 15))
+        self.preview_min_fps = float(camera_config.get('preview_min_fps', 5))
+        self.preview_backlog_frames = max(1, int(camera_config.get('encoder_queue_size', 30)) // 4)
+        self.preview_fps = self.preview_max_fps
+        self.preview_tick_seconds = 0.0  # Smoothed cost of one preview tick
+        self.preview_load_check = 0.0  # time.monotonic() of the next encoder queue check
+        self.encoder_queue_depth = 0  # Sampled off the Tk thread (a worker RPC under process isolation)
         self.staff_data = {}  # Map display name to staff dict
         self.scanner_ports = {}  # Map scanner display name to port
         self.camera_indices = {}  # Map camera display name to index
         self.last_scanner_port: Optional[str] = None
         self.scanner_reconnect_in_progress = False
         self.camera_reconnect_in_progress = False
+        self.camera_list_loading = False
+        self.last_camera_scan_time = 0.0
         self.active_uploads = {}
         self.upload_counter = 0
         
         # Recording timer
         self.recording_start_time = None
         self.timer_running = False
+        self.timer_job: Optional[str] = None  # Pending after() id of the timer tick
         
         # Auto-delete setting
         storage_config = self.config.get('storage', {})
@@ -119,11 +152,39 @@ class MainWindow(ctk.CTk):
     def _initialize_managers(self):
         """Initialize all managers after UI is shown"""
         # Initialize managers
-        self.camera_manager = CameraManager()
+        if self.config['camera'].get('process_isolation', False):
+            # Capture and encoding run in a worker process (own GIL)
+            self.camera_manager = CameraProcessClient()
+        else:
+            self.camera_manager = CameraManager()
+        self.multi_camera = MultiCameraRecorder(self.camera_manager)
         self.scanner_manager = ScannerManager()
         self.b2_uploader = B2Uploader()
         self.api_client = APIClient()
         self.metadata_manager = MetadataManager()
+        self.recovery_manager = RecoveryManager()
+        
+        # Recordings interrupted by a crash/power loss (before any new recording starts)
+        orphans = self.recovery_manager.find_orphans()
+        
+        # Start/stop/switch run in order on the session's thread; the window
+        # only follows its events
+        self.recording_session = RecordingSession(
+            self.camera_manager,
+            self.multi_camera,
+            segment_sink_factory=self._create_segment_uploader,
+            listener=lambda event, info: self.after(0, self._on_session_event, event, info),
+            max_seconds=self.record_limit_seconds
+        )
+        
+        # Faststart remux/proxy between stop and upload, held off while recording
+        self.post_processor = PostProcessor(is_busy=lambda: self.recording_session.is_recording)
+        
+        # Preview frames are shown 1:1 (not rescaled by CTkImage), so size
+        # them for the display scaling
+        scaling = ctk.ScalingTracker.get_widget_scaling(self.preview_canvas)
+        display_w, display_h = self.camera_manager.preview_display_size
+        self.camera_manager.preview_display_size = (round(display_w * scaling), round(display_h * scaling))
         
         # Initialize updater
         app_config = self.config['app']
@@ -143,6 +204,13 @@ class MainWindow(ctk.CTk):
         # Start camera preview
         self.start_camera_preview()
         
+        # Extra camera angles (camera.secondary_indices) record without a preview
+        self.multi_camera.start_cameras_async()
+        
+        # Order QR codes shown to the camera (scanner.vision_enabled)
+        self.vision_scanner = VisionScanner(self.camera_manager, self.scanner_manager.parse_order_id)
+        self.vision_scanner.start(lambda order_id: self.after(0, self.on_barcode_scanned, order_id))
+        
         # Defer scanner and staff list to further improve perceived speed
         self.after(100, self.refresh_scanner_list)
         self.after(200, self.refresh_staff_list)
@@ -151,6 +219,9 @@ class MainWindow(ctk.CTk):
         if app_config.get('check_updates_on_startup', False):
             self.after(1000, self._check_for_updates_background)
         
+        if orphans:
+            threading.Thread(target=self._recover_recordings, args=(orphans,), daemon=True).start()
+        
         logger.info("All components initialized")
         self.after(1500, self.monitor_auto_refresh)
     
@@ -183,6 +254,12 @@ class MainWindow(ctk.CTk):
         )
         self.preview_canvas.pack(pady=10, padx=0)
         
+        # Drag on the preview to select the recorded region, right-click to reset
+        self.preview_canvas.bind("<ButtonPress-1>", self.on_roi_drag_start)
+        self.preview_canvas.bind("<B1-Motion>", self.on_roi_drag_move)
+        self.preview_canvas.bind("<ButtonRelease-1>", self.on_roi_drag_end)
+        self.preview_canvas.bind("<Button-3>", self.on_roi_clear)
+        
         # QR Codes Section (below camera preview)
         self.qr_frame = ctk.CTkFrame(self.left_frame, corner_radius=10)
         self.qr_frame.pack(pady=(0, 10), padx=10, fill="x")
@@ -401,38 +478,54 @@ class MainWindow(ctk.CTk):
         self.record_button.pack(pady=(5, 10), padx=20, fill="x")
         
     
-    def refresh_camera_list(self):
-        """Refresh list of available cameras"""
+    def refresh_camera_list(self, quiet: bool = False):
+        """Refresh list of available cameras
+        
+        Args:
+            quiet: Hotplug check - only touch the UI if the camera set changed
+        """
         if self.camera_manager is None:
             return
-            
-        logger.info("Refreshing camera list")
-        self.camera_combobox.configure(values=["Đang tải..."])
-        self.camera_combobox.set("Đang tải...")
-        self.status_label.configure(text="Đang tải danh sách camera...", text_color="orange")
         
-        # Remember current camera if any
-        current_camera_idx = self.camera_manager.current_camera_index if self.camera_manager.cap is not None else None
+        if not quiet:
+            logger.info("Refreshing camera list")
+            self.camera_list_loading = True
+            self.camera_combobox.configure(values=["Đang tải..."])
+            self.camera_combobox.set("Đang tải...")
+            self.status_label.configure(text="Đang tải danh sách camera...", text_color="orange")
+        
+        # Scan runs on a worker thread; results are applied on the Tk thread
+        self.last_camera_scan_time = time.monotonic()
+        self.camera_manager.list_available_cameras_async(
+            lambda cameras: self.after(0, lambda: self._apply_camera_list(cameras, quiet))
+        )
+    
+    def _apply_camera_list(self, cameras: list, quiet: bool):
+        """Update camera selection with enumeration results"""
+        if self.camera_manager is None:
+            return
         
-        cameras = self.camera_manager.list_available_cameras()
+        camera_indices = {name: idx for idx, name in cameras}
+        if quiet and not self.camera_list_loading and camera_indices == self.camera_indices:
+            return
+        self.camera_list_loading = False
         
         if cameras:
             camera_names = [name for idx, name in cameras]
             self.camera_combobox.configure(values=camera_names)
             self.camera_combobox.set(camera_names[0])
-            self.camera_indices = {name: idx for idx, name in cameras}
+            self.camera_indices = camera_indices
             self.status_label.configure(
                 text=f"Đã tải {len(cameras)} camera",
                 text_color="green"
             )
             
-            # Restart camera if it was running
-            if current_camera_idx is not None:
-                # Find the camera name for current index
+            # Keep showing the running camera (enumeration never touches it)
+            if self.camera_manager.is_camera_open():
+                current_camera_idx = self.camera_manager.current_camera_index
                 for name, idx in self.camera_indices.items():
                     if idx == current_camera_idx:
                         self.camera_combobox.set(name)
-                        self.camera_manager.start_camera(current_camera_idx)
                         break
         else:
             self.camera_combobox.configure(values=["Không tìm thấy camera"])
@@ -574,33 +667,24 @@ class MainWindow(ctk.CTk):
             self.status_label.configure(text="Factory Default", text_color="cyan")
             return
         
-        current_order = self.order_entry.get().strip()
+        if self.recording_session is None:
+            return
         
-        # Case 1: Not recording - start recording with new order
+        # Not recording: the scan starts a recording, which needs a user
         if not self.is_recording:
-            self.order_entry.delete(0, 'end')
-            self.order_entry.insert(0, order_id)
+            if not self.get_current_user_id():
+                logger.warning("Cannot start recording: No user selected")
+                self.status_label.configure(text="Thiếu người sử dụng", text_color="red")
+                return
             self.status_label.configure(text=f"Đã scan: {order_id}", text_color="blue")
-            # Auto start recording
-            self.after(100, self.start_recording)
-        
-        # Case 2: Recording same order - stop recording
-        elif current_order == order_id:
-            logger.info(f"Scanned same order {order_id} - stopping recording")
+        elif order_id == self.current_recording_order:
             self.status_label.configure(text=f"Scan lại mã {order_id} - Dừng ghi", text_color="orange")
-            self.stop_recording(auto_mode=False)
-        
-        # Case 3: Recording different order - stop current, start new
         else:
-            logger.info(f"Scanned different order {order_id} - switching recording")
             self.status_label.configure(text=f"Chuyển sang mã {order_id}", text_color="orange")
-            # Stop current recording (auto mode - no popup)
-            self.stop_recording(auto_mode=True)
-            # Update order ID
-            self.order_entry.delete(0, 'end')
-            self.order_entry.insert(0, order_id)
-            # Start new recording after a short delay
-            self.after(500, self.start_recording)
+        
+        # The session decides start / stop (same order) / switch (other order)
+        # in scan order, even for scans arriving back to back
+        self.recording_session.scan(order_id)
     
     def refresh_staff_list(self):
         """Refresh list of staff members"""
@@ -725,10 +809,7 @@ class MainWindow(ctk.CTk):
         
         camera_manager = self.camera_manager
         if camera_manager is not None:
-            cap_ready = (
-                camera_manager.cap is not None and
-                camera_manager.cap.isOpened()
-            )
+            cap_ready = camera_manager.is_camera_open()
             if (not cap_ready) and (not self.camera_reconnect_in_progress):
                 self.camera_reconnect_in_progress = True
                 self.status_label.configure(
@@ -777,6 +858,11 @@ class MainWindow(ctk.CTk):
             self.refresh_staff_list()
         if not self.camera_indices:
             self.refresh_camera_list()
+        elif camera_manager is not None:
+            # Periodic hotplug check; only changed indices are re-probed
+            hotplug_interval = camera_manager.camera_config.get('hotplug_check_seconds', 30)
+            if hotplug_interval and time.monotonic() - self.last_camera_scan_time >= hotplug_interval:
+                self.refresh_camera_list(quiet=True)
         if not self.scanner_ports:
             self.refresh_scanner_list()
         
@@ -972,6 +1058,8 @@ class MainWindow(ctk.CTk):
             seconds = 0
         self.record_limit_seconds = seconds
         self.record_limit_var.set(choice)
+        if self.recording_session is not None:
+            self.recording_session.max_seconds = seconds
         if not self.is_recording:
             self.status_label.configure(
                 text=f"Giới hạn ghi: {seconds}s",
@@ -1061,6 +1149,7 @@ class MainWindow(ctk.CTk):
             
         if self.camera_manager.start_camera(0):
             self.update_preview_running = True
+            threading.Thread(target=self._sample_encoder_load, daemon=True).start()
             self.update_preview()
         else:
             self.status_label.configure(text="Không thể mở camera", text_color="red")
@@ -1070,29 +1159,162 @@ class MainWindow(ctk.CTk):
         if not self.update_preview_running or self.camera_manager is None:
             return
         
-        # Get frame for recording (unflipped) if recording
-        if self.is_recording:
-            recording_frame = self.camera_manager.get_frame()
-            if recording_frame is not None:
-                self.camera_manager.write_frame(recording_frame)
+        tick_start = time.perf_counter()
         
-        # Get frame for preview (with flip if enabled)
-        preview_frame = self.camera_manager.get_frame_for_preview()
+        # Recording is fed by the camera's capture thread; the preview only
+        # displays the newest frame, already downscaled (with flip if enabled)
+        preview_frame = self.camera_manager.get_preview_frame()
         
         if preview_frame is not None:
-            # Convert to PhotoImage for display
-            frame_rgb = cv2.cvtColor(preview_frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
+            height, width = preview_frame.shape[:2]
+            if self.preview_photo is None or self.preview_image.size != (width, height):
+                self._create_preview_sink(width, height)
             
-            # Resize to fit canvas
-            img.thumbnail((640, 480), Image.Resampling.LANCZOS)
-            
-            # Use CTkImage instead of PhotoImage to avoid warning
-            ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=(img.width, img.height))
-            self.preview_canvas.configure(image=ctk_image, text="")
+            # Decode BGR straight into the reused PIL image, then update the
+            # existing Tk photo's pixels in place (no new image objects per frame)
+            self.preview_image.frombytes(preview_frame, "raw", "BGR")
+            self._draw_roi_outline()
+            self.preview_photo.paste(self.preview_image)
         
         # Schedule next update
-        self.after(30, self.update_preview)  # ~30 FPS
+        self.after(self._next_preview_delay(time.perf_counter() - tick_start), self.update_preview)
+    
+    def _next_preview_delay(self, tick_seconds: float) -> int:
+        """
+        Adapt the preview rate to the recording load
+        
+        The preview runs at preview_fps when idle and at preview_recording_fps
+        while recording; if the encoder queue backs up it steps down toward
+        preview_min_fps and recovers gradually once the queue drains.
+        
+        Args:
+            tick_seconds: Time the preview tick just took
+        
+        Returns:
+            Delay in milliseconds until the next tick
+        """
+        self.preview_tick_seconds += (tick_seconds - self.preview_tick_seconds) * 0.2
+        
+        now = time.monotonic()
+        if now >= self.preview_load_check:
+            self.preview_load_check = now + 1.0
+            
+            backlog = self.encoder_queue_depth if self.is_recording else 0
+            
+            target = self.preview_recording_fps if self.is_recording else self.preview_max_fps
+            if backlog >= self.preview_backlog_frames:
+                slowed = max(self.preview_min_fps, self.preview_fps * 0.7)
+                if slowed < self.preview_fps:
+                    logger.info(f"Encoder queue at {backlog} frames, preview slowed to {slowed:.0f} fps")
+                self.preview_fps = slowed
+            elif self.preview_fps > target:
+                self.preview_fps = target
+            else:
+                self.preview_fps = min(target, self.preview_fps + 2)
+        
+        # Tick time counts toward the period; the preview never takes more
+        # than half of the GUI thread however slow a tick is
+        period = 1.0 / max(self.preview_fps, 1.0)
+        delay = max(period - self.preview_tick_seconds, self.preview_tick_seconds)
+        return max(1, int(delay * 1000))
+    
+    def _sample_encoder_load(self):
+        """Background thread sampling the encoder queue depth once per second"""
+        while self.update_preview_running:
+            depth = 0
+            if self.is_recording and self.camera_manager is not None:
+                try:
+                    depth = (self.camera_manager.get_encoder_stats() or {}).get('queue_depth', 0)
+                except Exception as e:
+                    logger.debug(f"Encoder stats unavailable: {e}")
+            self.encoder_queue_depth = depth
+            time.sleep(1.0)
+    
+    def _create_preview_sink(self, width: int, height: int):
+        """Allocate the preview PIL and Tk images once per preview size"""
+        self.preview_image = Image.new("RGB", (width, height))
+        self.preview_photo = ImageTk.PhotoImage(self.preview_image)
+        
+        # Photo is already sized for the display scaling, so CTkImage's
+        # HighDPI rescaling (and its warning for plain Tk images) does not apply
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.preview_canvas.configure(image=self.preview_photo, text="")
+        
+        logger.info(f"Preview image allocated: {width}x{height}")
+    
+    def _preview_point(self, event) -> Optional[Tuple[float, float]]:
+        """Map a mouse event on the preview to normalized image coordinates"""
+        if self.preview_image is None:
+            return None
+        
+        # Image is centered in the label
+        width, height = self.preview_image.size
+        offset_x = (event.widget.winfo_width() - width) / 2
+        offset_y = (event.widget.winfo_height() - height) / 2
+        x = min(max((event.x - offset_x) / width, 0.0), 1.0)
+        y = min(max((event.y - offset_y) / height, 0.0), 1.0)
+        return x, y
+    
+    def _to_frame_roi(self, rect: Tuple[float, float, float, float]) -> Tuple[float, float, float, float]:
+        """Convert between preview orientation and camera frame (undo/apply flip)"""
+        x, y, width, height = rect
+        if self.camera_manager is not None and self.camera_manager.flip_horizontal:
+            x = 1.0 - x - width
+        return (x, y, width, height)
+    
+    def on_roi_drag_start(self, event):
+        """Begin selecting the recording region on the preview"""
+        if self.camera_manager is None:
+            return
+        self.roi_drag_start = self._preview_point(event)
+        self.roi_drag_rect = None
+    
+    def on_roi_drag_move(self, event):
+        """Update the region being selected"""
+        point = self._preview_point(event)
+        if self.roi_drag_start is None or point is None:
+            return
+        
+        (x0, y0), (x1, y1) = self.roi_drag_start, point
+        self.roi_drag_rect = (min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0))
+    
+    def on_roi_drag_end(self, event):
+        """Apply the selected region (takes effect from the next recording)"""
+        rect = self.roi_drag_rect
+        self.roi_drag_start = None
+        self.roi_drag_rect = None
+        
+        # Ignore clicks and tiny drags
+        if rect is None or rect[2] < 0.02 or rect[3] < 0.02 or self.camera_manager is None:
+            return
+        
+        self.camera_manager.set_roi(self._to_frame_roi(rect))
+        if self.is_recording:
+            self.status_label.configure(text="Vùng ghi hình mới áp dụng từ lần ghi sau", text_color="orange")
+    
+    def on_roi_clear(self, event):
+        """Reset recording to the full frame"""
+        if self.camera_manager is None or self.camera_manager.roi is None:
+            return
+        self.camera_manager.set_roi(None)
+    
+    def _draw_roi_outline(self):
+        """Outline the selected (or being dragged) region on the preview image"""
+        if self.roi_drag_rect is not None:
+            rect = self.roi_drag_rect
+        elif self.camera_manager is not None and self.camera_manager.roi is not None:
+            rect = self._to_frame_roi(self.camera_manager.roi)
+        else:
+            return
+        
+        width, height = self.preview_image.size
+        x, y, w, h = rect
+        ImageDraw.Draw(self.preview_image).rectangle(
+            [x * width, y * height, (x + w) * width - 1, (y + h) * height - 1],
+            outline=(255, 200, 0),
+            width=2
+        )
     
     def toggle_recording(self):
         """Toggle recording on/off"""
@@ -1120,43 +1342,106 @@ class MainWindow(ctk.CTk):
             self.status_label.configure(text="Thiếu người sử dụng", text_color="red")
             return
         
-        success, video_path = self.camera_manager.start_recording(order_id)
-        
-        if success:
-            self.is_recording = True
-            self.current_video_path = video_path
-            self.current_recording_order = order_id
-            self.record_button.configure(
-                text="⏹ Dừng ghi hình",
-                fg_color="#16A34A",
-                hover_color="#15803D"
-            )
-            self.status_label.configure(text=f"Đang ghi: {order_id}", text_color="red")
-            
-            # Start recording timer
-            import time
-            self.recording_start_time = time.time()
-            self.timer_running = True
-            self.update_recording_timer()
-            
-            # Play start sound immediately
-            self.play_sound("1_start_record.mp3")
-            logger.info(f"Recording started for order: {order_id}")
-            
-            # Check for duplicate in background and play warning sound if needed
-            def check_dup():
-                is_duplicate = self.check_duplicate_order_on_b2(order_id)
-                if is_duplicate:
-                    self.play_sound("3_dupcode_continue.mp3")
-                    logger.warning(f"Duplicate order detected: {order_id} - continuing recording")
+        # Runs on the session thread; the UI follows its started/failed event
+        self.recording_session.start(order_id)
+    
+    def _on_session_event(self, event: str, info: dict):
+        """Apply a recording session event to the window (Tk thread)"""
+        if event == RecordingSession.STARTED:
+            order_id = info['order_id']
+            if self.order_entry.get().strip() != order_id:
+                self.order_entry.delete(0, 'end')
+                self.order_entry.insert(0, order_id)
             
-            threading.Thread(target=check_dup, daemon=True).start()
-        else:
+            # Paths come from the event: the session may have switched to
+            # another order before this runs
+            self.segment_uploader = info['segment_sink']
+            self.secondary_video_paths = info['secondary_paths']
+            self._on_recording_started(
+                order_id,
+                self.get_current_user_id(),
+                info['video_path'],
+                info['base_path'],
+                info['renames']
+            )
+        
+        elif event == RecordingSession.START_FAILED:
             logger.error("Failed to start recording")
-            self.status_label.configure(text="Lỗi bắt đầu ghi", text_color="red")
+            if info['disk_space_low']:
+                self.status_label.configure(text="Ổ đĩa không đủ dung lượng", text_color="red")
+            else:
+                self.status_label.configure(text="Lỗi bắt đầu ghi", text_color="red")
+        
+        elif event == RecordingSession.STOPPED:
+            self._on_recording_stopped(info)
+    
+    def _create_segment_uploader(self, order_id: str) -> Optional[SegmentUploader]:
+        """Segmented mode: uploader for parts finished while recording continues"""
+        if self.camera_manager.segment_seconds <= 0 or self.b2_uploader is None:
+            return None
+        
+        return SegmentUploader(
+            self.b2_uploader,
+            order_id,
+            self.camera_manager.wait_for_recording,
+            cleanup=bool(self.auto_delete_var.get())
+        )
+    
+    def _on_recording_started(
+        self,
+        order_id: str,
+        user_id: str,
+        video_path: str,
+        base_path: str,
+        renames: List[Tuple[str, str]]
+    ):
+        """Update state and UI once the camera records for an order (start or switch)"""
+        self.is_recording = True
+        self.current_video_path = video_path
+        self.current_recording_order = order_id
+        
+        # Removed after upload; a leftover marker means a crash (see RecoveryManager)
+        self.recovery_manager.mark_pending(
+            base_path,
+            order_id,
+            self.get_current_username(),
+            user_id,
+            renames=renames
+        )
+        
+        self.record_button.configure(
+            text="⏹ Dừng ghi hình",
+            fg_color="#16A34A",
+            hover_color="#15803D"
+        )
+        self.status_label.configure(text=f"Đang ghi: {order_id}", text_color="red")
+        
+        # Start recording timer
+        import time
+        self.recording_start_time = time.time()
+        self.timer_running = True
+        if self.timer_job is not None:
+            # Previous recording's tick (a switch restarts the timer immediately)
+            self.after_cancel(self.timer_job)
+            self.timer_job = None
+        self.update_recording_timer()
+        
+        # Play start sound immediately
+        self.play_sound("1_start_record.mp3")
+        logger.info(f"Recording started for order: {order_id}")
+        
+        # Check for duplicate in background and play warning sound if needed
+        def check_dup():
+            is_duplicate = self.check_duplicate_order_on_b2(order_id)
+            if is_duplicate:
+                self.play_sound("3_dupcode_continue.mp3")
+                logger.warning(f"Duplicate order detected: {order_id} - continuing recording")
+        
+        threading.Thread(target=check_dup, daemon=True).start()
     
     def update_recording_timer(self):
         """Update the recording timer display"""
+        self.timer_job = None
         if self.timer_running and self.recording_start_time:
             import time
             elapsed = int(time.time() - self.recording_start_time)
@@ -1178,10 +1463,10 @@ class MainWindow(ctk.CTk):
                         text="Đạt giới hạn thời gian, đang dừng...",
                         text_color="orange"
                     )
-                    self.after(0, lambda: self.stop_recording(auto_mode=True))
+                    self.recording_session.stop(order_id=self.current_recording_order, auto=True)
                     return
             # Schedule next update
-            self.after(1000, self.update_recording_timer)
+            self.timer_job = self.after(1000, self.update_recording_timer)
     
     def stop_recording(self, auto_mode: bool = False):
         """Stop video recording and upload
@@ -1192,37 +1477,47 @@ class MainWindow(ctk.CTk):
         if self.camera_manager is None or self.b2_uploader is None:
             return
         
-        # Calculate recording duration before stopping
-        import time
-        recording_duration = 0
-        if self.recording_start_time:
-            recording_duration = int(time.time() - self.recording_start_time)
+        # Runs on the session thread; upload starts from its stopped event
+        self.recording_session.stop(auto=auto_mode)
+    
+    def _on_recording_stopped(self, info: dict):
+        """Reset the UI for a finished recording and upload it (Tk thread)
+        
+        Args:
+            info: Stopped event of the recording session
+        """
+        video_path = info['video_path']
+        segment_uploader = info['segment_sink']
+        recording_base_path = info['base_path']
+        recording_crop = info['crop']
+        recording_duration = info['duration']
+        secondary_paths = info['secondary_paths']
+        auto_mode = info['auto']
         
         # Stop timer
         self.timer_running = False
         self.recording_start_time = None
         self.timer_label.configure(text="00:00", text_color="#666666")
-            
-        video_path = self.camera_manager.stop_recording()
+        
+        self.segment_uploader = None
+        self.secondary_video_paths = []
+        self.is_recording = False
+        self.current_recording_order = None
+        
+        self.record_button.configure(
+            text="⏺ Bắt đầu ghi hình",
+            fg_color="#DC2626",
+            hover_color="#991B1B"
+        )
         
         if video_path:
-            self.is_recording = False
-            recording_order = self.current_recording_order
-            self.current_recording_order = None
-            
-            self.record_button.configure(
-                text="⏺ Bắt đầu ghi hình",
-                fg_color="#DC2626",
-                hover_color="#991B1B"
-            )
-            
             if auto_mode:
                 self.status_label.configure(text="Đang xử lý...", text_color="orange")
             else:
                 self.status_label.configure(text="Đang upload...", text_color="orange")
             
             # Upload in background
-            order_id = recording_order if recording_order else self.order_entry.get().strip()
+            order_id = info['order_id']
             user_id = self.get_current_user_id()
             username = self.get_current_username()
             task_id = self._register_upload_task(order_id)
@@ -1238,58 +1533,90 @@ class MainWindow(ctk.CTk):
 
                     # Play end sound before upload
                     self.play_sound("2_end_record.mp3")
+                    
+                    # Encoder may still be flushing queued frames to the file
+                    frame_stats = None
+                    if self.camera_manager is not None:
+                        self.camera_manager.wait_for_recording(video_path)
+                        frame_stats = self.camera_manager.get_frame_stats(video_path)
+                    
+                    # Segments were uploaded while recording; whole files are
+                    # made streamable (and get a proxy) first
+                    proxy_path = None
+                    if segment_uploader is None:
+                        proxy_path = self.post_processor.process(video_path)['proxy_path']
                         
                     def progress_callback(bytes_sent, total_bytes):
                         progress = (bytes_sent / total_bytes) if total_bytes else 0
                         self.after(0, lambda p=progress: self._update_upload_progress(task_id, p))
                     
-                    url = self.b2_uploader.upload_with_cleanup(
-                        video_path,
-                        order_id,
-                        progress_callback,
-                        cleanup_override=bool(self.auto_delete_var.get())
-                    )
+                    manifest_url = None
+                    uploaded_files = {}  # Path or name -> URL, for the recovery marker
+                    if segment_uploader is not None:
+                        # Earlier segments are already uploaded or uploading;
+                        # the video URL is the first segment, the manifest
+                        # listing all of them is stored alongside
+                        segment_uploader.progress_callback = progress_callback
+                        segment_uploader.add(video_path)
+                        url = None
+                        if segment_uploader.finish():
+                            manifest_url = segment_uploader.upload_manifest(
+                                SegmentUploader.manifest_path(recording_base_path),
+                                self.camera_manager.camera_config['fps'],
+                                self.camera_manager.segment_seconds
+                            )
+                            if manifest_url:
+                                url = segment_uploader.segments[0]['url']
+                                uploaded_files.update({s['file']: s['url'] for s in segment_uploader.segments})
+                    else:
+                        url = self.b2_uploader.upload_with_cleanup(
+                            video_path,
+                            order_id,
+                            progress_callback,
+                            cleanup_override=bool(self.auto_delete_var.get())
+                        )
+                        if url:
+                            uploaded_files[video_path] = url
+                    
+                    # Extra angles go under the same video/{order_id}_ prefix
+                    secondary_failed = False
+                    for secondary_path in secondary_paths:
+                        self.multi_camera.wait_for_recording(secondary_path)
+                        self.post_processor.process(secondary_path, make_proxy=False)
+                        secondary_url = self.b2_uploader.upload_with_cleanup(
+                            secondary_path,
+                            order_id,
+                            cleanup_override=bool(self.auto_delete_var.get())
+                        )
+                        if secondary_url:
+                            uploaded_files[secondary_path] = secondary_url
+                        else:
+                            secondary_failed = True
+                            logger.error(f"Failed to upload secondary camera file: {secondary_path}")
+                    
+                    proxy_url = None
+                    if url and proxy_path:
+                        proxy_url = self.b2_uploader.upload_with_cleanup(
+                            proxy_path,
+                            order_id,
+                            cleanup_override=bool(self.auto_delete_var.get())
+                        )
                     
                     if url:
-                        # Save metadata JSON locally first
-                        json_b2_url = None
-                        if username and self.metadata_manager is not None:
-                            # Save JSON locally
-                            json_saved = self.metadata_manager.save_metadata(
-                                order_id=order_id,
-                                username=username,
-                                video_url=url,
-                                user_id=user_id,
-                                duration=recording_duration
+                        # Save metadata JSON locally first, then upload it
+                        self._save_and_upload_metadata(
+                            order_id, username, url, user_id, recording_duration, recording_crop, frame_stats,
+                            proxy_url, manifest_url
+                        )
+                        
+                        if not secondary_failed:
+                            # Uploaded; nothing left for startup recovery
+                            self.recovery_manager.mark_done(recording_base_path)
+                        else:
+                            # Startup recovery only retries the failed camera files
+                            self.recovery_manager.mark_uploaded(
+                                recording_base_path, uploaded_files, video_url=url, metadata_saved=True
                             )
-                            
-                            if json_saved:
-                                logger.info(f"Metadata JSON saved locally for order {order_id}")
-                                
-                                # Find the JSON file that was just created
-                                metadata_dir = Path(self.metadata_manager.metadata_dir)
-                                json_files = sorted(
-                                    metadata_dir.glob(f"{order_id}_*.json"),
-                                    key=lambda x: x.stat().st_mtime,
-                                    reverse=True
-                                )
-                                
-                                if json_files:
-                                    latest_json = json_files[0]
-                                    # Upload JSON to B2
-                                    json_b2_url = self.b2_uploader.upload_json_metadata(
-                                        str(latest_json),
-                                        order_id
-                                    )
-                                    
-                                    if json_b2_url:
-                                        logger.info(f"Metadata JSON uploaded to B2: {json_b2_url}")
-                                        
-                                        # Update local JSON with B2 URL (same file)
-                                        self.metadata_manager.update_metadata(
-                                            order_id=order_id,
-                                            json_b2_url=json_b2_url
-                                        )
                         
                         # Upload metadata to API (disabled - endpoint not available)
                         # if user_id:
@@ -1329,6 +1656,141 @@ class MainWindow(ctk.CTk):
             
             threading.Thread(target=upload, daemon=True).start()
     
+    def _save_and_upload_metadata(
+        self,
+        order_id: str,
+        username: Optional[str],
+        video_url: str,
+        user_id: Optional[str],
+        duration: Optional[int],
+        crop: Optional[dict] = None,
+        frame_stats: Optional[dict] = None,
+        proxy_url: Optional[str] = None,
+        manifest_url: Optional[str] = None
+    ):
+        """Save recording metadata JSON locally and upload it to B2 (background thread)"""
+        if not username or self.metadata_manager is None:
+            return
+        
+        # Save JSON locally
+        json_saved = self.metadata_manager.save_metadata(
+            order_id=order_id,
+            username=username,
+            video_url=video_url,
+            user_id=user_id,
+            duration=duration,
+            crop=crop,
+            frame_stats=frame_stats,
+            proxy_url=proxy_url,
+            manifest_url=manifest_url
+        )
+        
+        if not json_saved:
+            return
+        
+        logger.info(f"Metadata JSON saved locally for order {order_id}")
+        
+        # Find the JSON file that was just created
+        metadata_dir = Path(self.metadata_manager.metadata_dir)
+        json_files = sorted(
+            metadata_dir.glob(f"{order_id}_*.json"),
+            key=lambda x: x.stat().st_mtime,
+            reverse=True
+        )
+        
+        if json_files:
+            latest_json = json_files[0]
+            # Upload JSON to B2
+            json_b2_url = self.b2_uploader.upload_json_metadata(
+                str(latest_json),
+                order_id
+            )
+            
+            if json_b2_url:
+                logger.info(f"Metadata JSON uploaded to B2: {json_b2_url}")
+                
+                # Update local JSON with B2 URL (same file)
+                self.metadata_manager.update_metadata(
+                    order_id=order_id,
+                    json_b2_url=json_b2_url
+                )
+    
+    def _recover_recordings(self, orphans: List[dict]):
+        """Repair and upload recordings left over from a crash (background thread)"""
+        cleanup = bool(self.auto_delete_var.get())
+        
+        for orphan in orphans:
+            order_id = orphan['order_id']
+            logger.info(f"Recovering recording of order {order_id} from {orphan['started']}")
+            
+            # Repair each file; unplayable ones are moved aside, not retried
+            files = []
+            for path in orphan['files'] + orphan['camera_files']:
+                if self.recovery_manager.repair(path):
+                    files.append(path)
+                else:
+                    self.recovery_manager.set_aside(path)
+            
+            main_files = [path for path in files if path in orphan['files']]
+            camera_files = [path for path in files if path in orphan['camera_files']]
+            
+            # Main recording uploaded before the crash/failure: only the rest is left
+            url = orphan['video_url']
+            manifest_url = None
+            main_done = url is not None
+            uploads = {}
+            
+            if not main_done and main_files:
+                duration = int(sum(self.recovery_manager.get_duration(path) for path in main_files))
+                
+                if main_files != [orphan['recording_path']]:
+                    # Segmented recording: upload the parts and a manifest
+                    uploader = SegmentUploader(self.b2_uploader, order_id, lambda path: True, cleanup=cleanup)
+                    for path in main_files:
+                        uploader.add(path)
+                    if uploader.finish():
+                        manifest_url = uploader.upload_manifest(
+                            SegmentUploader.manifest_path(orphan['recording_path']),
+                            self.camera_manager.camera_config['fps'],
+                            self.camera_manager.segment_seconds
+                        )
+                        if manifest_url:
+                            url = uploader.segments[0]['url']
+                            uploads.update({s['file']: s['url'] for s in uploader.segments})
+                else:
+                    url = self.b2_uploader.upload_with_cleanup(main_files[0], order_id, cleanup_override=cleanup)
+                    if url:
+                        uploads[main_files[0]] = url
+                
+                if url:
+                    self._save_and_upload_metadata(
+                        order_id, orphan.get('username'), url, orphan.get('user_id'), duration,
+                        manifest_url=manifest_url
+                    )
+                    main_done = True
+            elif not main_done:
+                # Lost (or set aside); secondary angles are still uploaded
+                logger.error(f"Main recording of order {order_id} is not recoverable")
+                main_done = True
+            
+            camera_failed = False
+            for path in camera_files:
+                camera_url = self.b2_uploader.upload_with_cleanup(path, order_id, cleanup_override=cleanup)
+                if camera_url:
+                    uploads[path] = camera_url
+                else:
+                    camera_failed = True
+            
+            if main_done and not camera_failed:
+                self.recovery_manager.finish(orphan)
+                logger.info(f"Recovered recording uploaded for order {order_id}: {url}")
+            else:
+                # Marker stays with what succeeded; the rest is retried on next start
+                self.recovery_manager.mark_uploaded(
+                    orphan['recording_path'], uploads, video_url=url, metadata_saved=url is not None
+                )
+                logger.error(f"Recovered recording upload failed for order {order_id}")
+    
     def _check_for_updates_background(self):
         """Check for updates in background thread"""
         def check_updates():
@@ -1440,8 +1902,18 @@ Lưu ý: Ứng dụng sẽ tải file .exe mới vào thư mục Temp và mở E
         """Cleanup on window close"""
         logger.info("Application closing")
         self.update_preview_running = False
+        if self.vision_scanner is not None:
+            self.vision_scanner.stop()
+        if self.recording_session is not None:
+            self.recording_session.shutdown()
+        if self.post_processor is not None:
+            self.post_processor.shutdown()
+        if self.multi_camera is not None:
+            self.multi_camera.stop()
         if self.camera_manager is not None:
             self.camera_manager.stop_camera()
+            if isinstance(self.camera_manager, CameraProcessClient):
+                self.camera_manager.shutdown()
         if self.scanner_manager is not None:
             self.scanner_manager.disconnect()
         self.destroy()
@@ -45,7 +45,7 @@ class MetadataManager:
             logger.error(f"Failed to initialize MetadataManager: {e}")
             raise
     
-    def save_metadata(self, order_id: str, username: str, video_url: str, json_b2_url: Optional[str] = None, user_id: Optional[str] = None, duration: Optional[int] = None) -> bool:
+    def save_metadata(self, order_id: str, username: str, video_url: str, json_b2_url: Optional[str] = None, user_id: Optional[str] = None, duration: Optional[int] = None, crop: Optional[dict] = None, frame_stats: Optional[dict] = None, proxy_url: Optional[str] = None, manifest_url: Optional[str] = None) -> bool:
         """
         Save recording metadata as JSON file
         
@@ -56,6 +56,13 @@ class MetadataManager:
             json_b2_url: Deprecated, kept for backwards compatibility
             user_id: User ID (optional)
             duration: Recording duration in seconds (optional)
+            crop: Recorded region of the camera frame in pixels (optional)
+            frame_stats: Frame counters of the recording (optional,
+                CameraManager.get_frame_stats); its media duration replaces
+                the duration argument
+            proxy_url: B2 URL of the low-resolution proxy (optional)
+            manifest_url: B2 URL of the segment manifest of a segmented
+                recording; video_url is then its first segment (optional)
             
         Returns:
             True if saved successfully, False otherwise
@@ -65,6 +72,10 @@ class MetadataManager:
             now = datetime.now()
             timestamp = now.strftime("%Y%m%d_%H%M%S")
             
+            # Length of the video itself, not the wall-clock time of the recording
+            if frame_stats:
+                duration = int(round(frame_stats['media_duration']))
+            
             # Create metadata structure
             metadata = {
                 "id": order_id,
@@ -78,6 +89,14 @@ class MetadataManager:
             # Add optional fields
             if user_id:
                 metadata["id_user"] = user_id
+            if crop:
+                metadata["crop"] = crop
+            if frame_stats:
+                metadata["frames"] = frame_stats
+            if proxy_url:
+                metadata["url_proxy"] = proxy_url
+            if manifest_url:
+                metadata["url_manifest"] = manifest_url
             
             # Create filename
             filename = f"{order_id}_{timestamp}.json"
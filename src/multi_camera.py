@@ -0,0 +1,273 @@
+"""
+Multi Camera Module - Records additional camera angles alongside the main camera
+Each extra camera runs its own CameraManager (own capture thread and encoder)
+and records into its own file for the same order
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .camera_manager import CameraManager
+from .logger import setup_logger
+
+logger = setup_logger("MultiCamera")
+
+
+class MultiCameraRecorder:
+    """Drives secondary cameras in step with the primary CameraManager"""
+    
+    def __init__(self, primary: CameraManager, config_path: Optional[str] = None):
+        """
+        Initialize Multi Camera Recorder
+        
+        Args:
+            primary: Camera manager of the preview/main camera
+            config_path: Path to config.yaml file (same file as the primary)
+        """
+        self.primary = primary
+        
+        indices = primary.camera_config.get('secondary_indices') or []
+        self.secondary_indices: List[int] = [int(i) for i in indices]
+        
+        # One manager per extra camera; opened by start_cameras()
+        self.cameras: Dict[int, CameraManager] = {
+            index: CameraManager(config_path) for index in self.secondary_indices
+        }
+        
+        # Output path of each camera for the current/last recording
+        self.recording_paths: Dict[int, str] = {}
+        self.last_fps_report: Dict[int, dict] = {}
+    
+    @property
+    def enabled(self) -> bool:
+        """True if any secondary camera is configured"""
+        return bool(self.cameras)
+    
+    def start_cameras(self) -> List[int]:
+        """
+        Open all secondary cameras
+        
+        Returns:
+            Indices of cameras that started
+        """
+        started = []
+        
+        for index, camera in self.cameras.items():
+            if index == self.primary.current_camera_index:
+                logger.warning(f"Camera {index} is the main camera - not opened as secondary")
+                continue
+            
+            if camera.start_camera(index):
+                started.append(index)
+                # Let the primary's camera scan report it without reopening the device
+                self.primary.share_camera(index, camera)
+            else:
+                logger.error(f"Failed to start secondary camera {index}")
+        
+        logger.info(f"Secondary cameras running: {started}")
+        return started
+    
+    def start_cameras_async(self) -> bool:
+        """
+        Open secondary cameras on a background thread (opening blocks for seconds)
+        
+        Returns:
+            True if a start was scheduled
+        """
+        if not self.enabled:
+            return False
+        
+        threading.Thread(target=self.start_cameras, daemon=True).start()
+        return True
+    
+    def _active_cameras(self) -> Dict[int, CameraManager]:
+        """Secondary cameras that are open and not the primary device"""
+        return {
+            index: camera for index, camera in self.cameras.items()
+            if index != self.primary.current_camera_index
+            and camera.cap is not None and camera.cap.isOpened()
+        }
+    
+    def start_recording(self, order_id: str) -> List[str]:
+        """
+        Start recording on every secondary camera
+        Call after the primary has started so all files share its timestamp
+        
+        Args:
+            order_id: Order ID for filenames
+        
+        Returns:
+            Output paths of the cameras that started recording
+        """
+        self.recording_paths = {}
+        
+        for index, camera in self._active_cameras().items():
+            success, path = camera.start_recording(
+                order_id,
+                filename_suffix=f"_cam{index}",
+                timestamp=self.primary.recording_timestamp
+            )
+            if success:
+                self.recording_paths[index] = path
+            else:
+                logger.error(f"Camera {index} failed to start recording for {order_id}")
+        
+        return list(self.recording_paths.values())
+    
+    def switch_recording(self, order_id: str) -> List[str]:
+        """
+        Hand every secondary recording over to another order without a gap
+        Call after the primary has switched so all files share its timestamp
+        
+        Args:
+            order_id: Order ID of the new recording
+        
+        Returns:
+            Finished files of the previous recording (every segment if segmented)
+        """
+        finished = []
+        self.recording_paths = {}
+        
+        for index, camera in self._active_cameras().items():
+            if not camera.is_recording:
+                continue
+            
+            segments = list(camera.recording_segments)
+            previous, path = camera.switch_recording(
+                order_id,
+                filename_suffix=f"_cam{index}",
+                timestamp=self.primary.recording_timestamp
+            )
+            if path is not None:
+                finished.extend(segments)
+                self.recording_paths[index] = path
+                continue
+            
+            # Fall back to stop and start; this camera loses the reopen time
+            logger.error(f"Camera {index} failed to switch recording to {order_id}")
+            if camera.stop_recording():
+                finished.extend(camera.recording_segments)
+            success, path = camera.start_recording(
+                order_id,
+                filename_suffix=f"_cam{index}",
+                timestamp=self.primary.recording_timestamp
+            )
+            if success:
+                self.recording_paths[index] = path
+        
+        return finished
+    
+    def pending_renames(self) -> List[Tuple[str, str]]:
+        """Standby files of the secondary recordings awaiting their final name"""
+        return [
+            camera.pending_rename for camera in self.cameras.values()
+            if camera.is_recording and camera.pending_rename is not None
+        ]
+    
+    def stop_recording(self) -> List[str]:
+        """
+        Stop recording on every secondary camera
+        
+        Returns:
+            Output paths of the stopped recordings (every segment if segmented)
+        """
+        paths = []
+        
+        for index, camera in self.cameras.items():
+            if not camera.is_recording:
+                continue
+            if camera.stop_recording():
+                paths.extend(camera.recording_segments)
+        
+        self.last_fps_report = self.get_fps_report()
+        return paths
+    
+    def wait_for_recording(self, output_path: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a secondary recording has been fully written to disk
+        
+        Args:
+            output_path: Path returned by stop_recording
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        
+        Returns:
+            True if the file is finalized and safe to read
+        """
+        for camera in self.cameras.values():
+            if output_path in camera._finalizing:
+                return camera.wait_for_recording(output_path, timeout)
+        return True
+    
+    def get_fps_report(self) -> Dict[int, dict]:
+        """
+        Get achieved capture rate of every camera for the last recording
+        
+        Returns:
+            Dictionary of camera index -> {'target_fps', 'actual_fps', 'frames', 'dropped'}
+        """
+        report = {}
+        
+        managers = {self.primary.current_camera_index: self.primary}
+        managers.update(self.cameras)
+        
+        for index, camera in managers.items():
+            stats = camera.get_recording_stats()
+            if not stats:
+                continue
+            
+            encoder_stats = camera.get_encoder_stats() or {}
+            wall_duration = stats['wall_duration']
+            report[index] = {
+                'target_fps': stats['fps'],
+                'actual_fps': round(stats['frames_in'] / wall_duration, 2) if wall_duration > 0 else 0.0,
+                'frames': stats['frames_in'],
+                'dropped': encoder_stats.get('frames_dropped', 0)
+            }
+        
+        return report
+    
+    def log_fps_report(self):
+        """Log per-camera capture rate, flagging cameras that fell behind"""
+        for index, entry in sorted(self.get_fps_report().items()):
+            message = (
+                f"Camera {index}: {entry['actual_fps']:.1f}/{entry['target_fps']} fps "
+                f"({entry['frames']} frames, {entry['dropped']} dropped by encoder)"
+            )
+            if entry['actual_fps'] < entry['target_fps'] * 0.9 or entry['dropped']:
+                logger.warning(message + " - not keeping up")
+            else:
+                logger.info(message)
+    
+    def stop(self):
+        """Stop recording and release all secondary cameras"""
+        for index, camera in self.cameras.items():
+            self.primary.unshare_camera(index)
+            camera.stop_camera()
+        logger.info("Secondary cameras stopped")
+
+
+if __name__ == "__main__":
+    # Test multi-camera recording with the configured secondary cameras
+    import time
+    
+    primary = CameraManager()
+    recorder = MultiCameraRecorder(primary)
+    
+    if not recorder.enabled:
+        print("No camera.secondary_indices configured")
+    elif primary.start_camera(0):
+        recorder.start_cameras()
+        
+        success, path = primary.start_recording("TEST_MULTI")
+        if success:
+            extra_paths = recorder.start_recording("TEST_MULTI")
+            time.sleep(5)
+            primary.stop_recording()
+            recorder.stop_recording()
+            
+            print(f"Main: {path}")
+            print(f"Secondary: {extra_paths}")
+            recorder.log_fps_report()
+        
+        recorder.stop()
+        primary.stop_camera()
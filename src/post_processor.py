@@ -0,0 +1,261 @@
+"""
+Post Processor Module - Prepares finished recordings for browser playback
+Remuxes MP4 files so the index (moov) comes first and playback can start
+before the download finishes, and optionally renders a small proxy copy.
+Jobs run right away on a worker pool with ffmpeg below normal priority, so
+the recording (normal priority) keeps the CPU it needs
+"""
+
+import os
+import struct
+import subprocess
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import yaml
+
+from .logger import setup_logger
+from .video_encoder import find_ffmpeg, subprocess_flags
+
+logger = setup_logger("PostProcessor")
+
+
+def _low_priority() -> dict:
+    """subprocess.Popen arguments that run ffmpeg below normal priority"""
+    if os.name == "nt":
+        return {"creationflags": subprocess_flags() | getattr(subprocess, "BELOW_NORMAL_PRIORITY_CLASS", 0)}
+    return {"preexec_fn": lambda: os.nice(10)}
+
+
+class PostProcessor:
+    """Faststart remux and proxy rendering of finished recordings"""
+    
+    PROXY_SUFFIX = "_proxy"
+    TEMP_SUFFIX = ".faststart"
+    
+    def __init__(self, config_path: Optional[str] = None, is_busy: Optional[Callable[[], bool]] = None):
+        """
+        Initialize Post Processor
+        
+        Args:
+            config_path: Path to config.yaml file
+            is_busy: Returns True while a recording is running; jobs may
+                wait for it to clear, at most post_processing.idle_wait_seconds
+                after they were submitted (0 = never wait)
+        """
+        if config_path is None:
+            from .resource_path import get_resource_path
+            config_path = get_resource_path("config/config.yaml")
+        
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+        
+        post_config = self.config.get('post_processing', {})
+        self.faststart = bool(post_config.get('faststart', True))
+        self.proxy = bool(post_config.get('proxy', False))
+        self.proxy_width = int(post_config.get('proxy_width', 480))
+        self.proxy_crf = int(post_config.get('proxy_crf', 32))
+        self.idle_wait_seconds = float(post_config.get('idle_wait_seconds', 0))
+        
+        self.ffmpeg_path = find_ffmpeg(self.config.get('ffmpeg', {}).get('path', ''))
+        if self.ffmpeg_path is None and (self.faststart or self.proxy):
+            logger.warning("ffmpeg not found, recordings are uploaded without post-processing")
+        
+        self.is_busy = is_busy
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, int(post_config.get('workers', 1))),
+            thread_name_prefix="PostProcessor"
+        )
+    
+    def submit(self, video_path: str, make_proxy: bool = True) -> Future:
+        """
+        Queue a finished recording for post-processing
+        
+        Args:
+            video_path: Finalized MP4 file
+            make_proxy: Render a proxy if post_processing.proxy is on
+        
+        Returns:
+            Future resolving to the process() result
+        """
+        deadline = time.monotonic() + self.idle_wait_seconds
+        return self._pool.submit(self._process, video_path, make_proxy, deadline)
+    
+    def process(self, video_path: str, make_proxy: bool = True) -> dict:
+        """
+        Post-process a finished recording and wait for the result
+        
+        Args:
+            video_path: Finalized MP4 file
+            make_proxy: Render a proxy if post_processing.proxy is on
+        
+        Returns:
+            Dictionary with video_path (unchanged, remuxed in place),
+            faststart (True if the index is at the front) and proxy_path
+            (None if no proxy was made); the file is left as it is if
+            post-processing fails
+        """
+        try:
+            return self.submit(video_path, make_proxy).result()
+        except Exception as e:
+            logger.error(f"Post-processing failed for {video_path}: {e}")
+            return {"video_path": video_path, "faststart": False, "proxy_path": None}
+    
+    def shutdown(self, wait: bool = False):
+        """
+        Stop the worker pool
+        
+        Args:
+            wait: Finish queued jobs first
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+    
+    def _process(self, video_path: str, make_proxy: bool, deadline: float) -> dict:
+        """Worker: run the enabled steps on one file"""
+        result = {"video_path": video_path, "faststart": False, "proxy_path": None}
+        if self.ffmpeg_path is None or not Path(video_path).exists():
+            return result
+        
+        self._wait_until_idle(deadline)
+        
+        start = time.monotonic()
+        if self.faststart:
+            result['faststart'] = self._make_faststart(video_path)
+        if self.proxy and make_proxy:
+            result['proxy_path'] = self._make_proxy(video_path)
+        
+        logger.info(
+            f"Post-processed {Path(video_path).name} in {time.monotonic() - start:.1f}s "
+            f"(faststart: {result['faststart']}, proxy: {result['proxy_path'] is not None})"
+        )
+        return result
+    
+    def _wait_until_idle(self, deadline: float):
+        """Hold the job while a recording is running, until its deadline
+        
+        The deadline is fixed at submit time, so jobs queued behind a
+        waiting one do not add their own wait on back-to-back recordings.
+        """
+        if self.is_busy is None or self.idle_wait_seconds <= 0:
+            return
+        
+        while self.is_busy():
+            if time.monotonic() >= deadline:
+                logger.info("Recording still running, post-processing at low priority")
+                return
+            time.sleep(0.5)
+    
+    @staticmethod
+    def _top_level_atoms(video_path: str) -> List[str]:
+        """Types of the top-level MP4 boxes in file order"""
+        atoms = []
+        with open(video_path, 'rb') as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                
+                size, kind = struct.unpack(">I4s", header)
+                atoms.append(kind.decode('latin-1'))
+                header_size = 8
+                if size == 1:
+                    # 64-bit box size follows the type
+                    size = struct.unpack(">Q", f.read(8))[0]
+                    header_size = 16
+                elif size == 0:
+                    # Box runs to the end of the file
+                    break
+                if size < header_size:
+                    break
+                f.seek(size - header_size, os.SEEK_CUR)
+        return atoms
+    
+    def _make_faststart(self, video_path: str) -> bool:
+        """Remux in place with the index at the front (no re-encode)"""
+        try:
+            atoms = self._top_level_atoms(video_path)
+        except OSError as e:
+            logger.error(f"Cannot read {video_path}: {e}")
+            return False
+        
+        # Regular MP4 with the index already first; fragmented files are
+        # remuxed too so browsers can seek them
+        if "moov" in atoms and "mdat" in atoms and atoms.index("moov") < atoms.index("mdat") and "moof" not in atoms:
+            return True
+        
+        source = Path(video_path)
+        remuxed = source.with_name(source.stem + self.TEMP_SUFFIX + source.suffix)
+        command = [
+            self.ffmpeg_path,
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-i", str(source),
+            "-map", "0",
+            "-c", "copy",
+            "-movflags", "+faststart",
+            str(remuxed)
+        ]
+        
+        if not self._run(command, remuxed):
+            return False
+        
+        remuxed.replace(source)
+        return True
+    
+    def _make_proxy(self, video_path: str) -> Optional[str]:
+        """Render a small single-threaded H.264 copy next to the recording"""
+        source = Path(video_path)
+        proxy = source.with_name(source.stem + self.PROXY_SUFFIX + source.suffix)
+        command = [
+            self.ffmpeg_path,
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-i", str(source),
+            "-vf", f"scale='min({self.proxy_width},iw)':-2",
+            "-c:v", "libx264",
+            "-preset", "veryfast",
+            "-crf", str(self.proxy_crf),
+            "-pix_fmt", "yuv420p",
+            "-threads", "1",
+            "-an",
+            "-movflags", "+faststart",
+            str(proxy)
+        ]
+        
+        if not self._run(command, proxy):
+            return None
+        return str(proxy)
+    
+    def _run(self, command: List[str], output: Path) -> bool:
+        """Run ffmpeg at low priority; removes the output on failure"""
+        try:
+            result = subprocess.run(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=600,
+                **_low_priority()
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.error(f"ffmpeg failed for {output.name}: {e}")
+            output.unlink(missing_ok=True)
+            return False
+        
+        if result.returncode != 0 or not output.exists():
+            logger.error(
+                f"ffmpeg failed for {output.name}: "
+                f"{result.stderr.decode('utf-8', errors='ignore').strip()}"
+            )
+            output.unlink(missing_ok=True)
+            return False
+        return True
+
+
+if __name__ == "__main__":
+    # Post-process a file given on the command line
+    import sys
+    
+    processor = PostProcessor()
+    processor.proxy = True
+    print(processor.process(sys.argv[1]))
+    processor.shutdown(wait=True)
@@ -0,0 +1,405 @@
+"""
+Recording Session Module - Start/stop/switch logic independent of the GUI
+All recording commands (scans, button presses, time limit) go through one
+queue and are executed in order on a single thread, so rapid scan sequences
+cannot interleave. The window only reacts to the session's events.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from .logger import setup_logger
+
+logger = setup_logger("RecordingSession")
+
+
+class RecordingSession:
+    """Serializes recording commands for one camera (plus secondary cameras)"""
+    
+    # States
+    IDLE = "idle"
+    RECORDING = "recording"
+    
+    # Events passed to the listener
+    STARTED = "started"
+    START_FAILED = "start_failed"
+    STOPPED = "stopped"
+    
+    def __init__(
+        self,
+        camera_manager,
+        multi_camera=None,
+        segment_sink_factory: Optional[Callable[[str], Optional[object]]] = None,
+        listener: Optional[Callable[[str, dict], None]] = None,
+        max_seconds: float = 0
+    ):
+        """
+        Initialize session and start its command thread
+        
+        Args:
+            camera_manager: CameraManager or CameraProcessClient
+            multi_camera: MultiCameraRecorder for secondary cameras (optional)
+            segment_sink_factory: Creates the per-recording segment receiver
+                (e.g. SegmentUploader) for an order, or returns None; the
+                receiver needs add(path) and finish()
+            listener: Called on the command thread with (event, info);
+                GUI listeners must marshal to their own thread
+            max_seconds: Recording time limit for the disk space check
+                (updated by the window when the limit changes)
+        """
+        self.camera_manager = camera_manager
+        self.multi_camera = multi_camera
+        self.segment_sink_factory = segment_sink_factory
+        self.listener = listener
+        self.max_seconds = max_seconds
+        
+        self.state = self.IDLE
+        self.current_order: Optional[str] = None
+        
+        # Latency from a scan to the first frame in the new file (seconds)
+        self.latencies: deque = deque(maxlen=200)
+        self.last_latency: Optional[float] = None
+        
+        self._recording: Optional[dict] = None  # Bookkeeping of the active recording
+        self._awaiting_frame: Optional[tuple] = None  # (base path, command time)
+        self._commands: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        
+        # Frames are only observable in-process; the client has no listener
+        if hasattr(camera_manager, 'add_frame_listener'):
+            camera_manager.add_frame_listener(self._on_frame)
+        
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    @property
+    def is_recording(self) -> bool:
+        """True while a recording is active (as seen by the command thread)"""
+        return self.state == self.RECORDING
+    
+    def scan(self, order_id: str):
+        """
+        Queue a scanned order
+        
+        Idle: start recording it. Recording the same order: stop.
+        Recording another order: switch to it without a gap.
+        
+        Args:
+            order_id: Parsed order ID
+        """
+        self._commands.put(("scan", order_id, time.monotonic(), False))
+    
+    def start(self, order_id: str):
+        """
+        Queue a start (ignored while recording)
+        
+        Args:
+            order_id: Order ID to record
+        """
+        self._commands.put(("start", order_id, time.monotonic(), False))
+    
+    def stop(self, order_id: Optional[str] = None, auto: bool = False):
+        """
+        Queue a stop
+        
+        Args:
+            order_id: Only stop if this order is still being recorded
+                (e.g. a time limit for a recording that was already switched)
+            auto: Stopped automatically (no error popup on upload failure)
+        """
+        self._commands.put(("stop", order_id, time.monotonic(), auto))
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued command has been executed
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        
+        Returns:
+            True if the queue drained in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._commands.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+    
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the command thread after the queued commands (does not stop recording)"""
+        if hasattr(self.camera_manager, 'remove_frame_listener'):
+            self.camera_manager.remove_frame_listener(self._on_frame)
+        self._commands.put(None)
+        self._thread.join(timeout)
+    
+    def get_latency_stats(self) -> dict:
+        """
+        Get scan-to-first-frame latency statistics
+        
+        Returns:
+            Dictionary with count, avg_ms, p95_ms and max_ms
+        """
+        values = sorted(self.latencies)
+        if not values:
+            return {"count": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        
+        return {
+            "count": len(values),
+            "avg_ms": round(sum(values) / len(values) * 1000, 1),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1)
+        }
+    
+    def _run(self):
+        """Command thread: execute queued commands one at a time"""
+        while True:
+            command = self._commands.get()
+            try:
+                if command is None:
+                    break
+                self._execute(*command)
+            except Exception as e:
+                logger.error(f"Recording command {command[0]} failed: {str(e)}")
+            finally:
+                self._commands.task_done()
+    
+    def _execute(self, action: str, order_id: Optional[str], issued: float, auto: bool):
+        """Apply one command to the current state"""
+        if action == "scan":
+            if self.state == self.IDLE:
+                self._start(order_id, issued)
+            elif order_id == self.current_order:
+                logger.info(f"Scanned same order {order_id} - stopping recording")
+                self._stop(auto=False)
+            else:
+                logger.info(f"Scanned different order {order_id} - switching recording")
+                self._switch(order_id, issued)
+        
+        elif action == "start":
+            if self.state == self.IDLE:
+                self._start(order_id, issued)
+            else:
+                logger.warning(f"Already recording {self.current_order} - start of {order_id} ignored")
+        
+        elif action == "stop":
+            if self.state == self.IDLE:
+                return
+            if order_id is not None and order_id != self.current_order:
+                logger.info(f"Stop for {order_id} ignored - now recording {self.current_order}")
+                return
+            self._stop(auto=auto)
+    
+    def _create_sink(self, order_id: str):
+        """Segment receiver for a new recording (None if not segmented)"""
+        if self.segment_sink_factory is None:
+            return None
+        return self.segment_sink_factory(order_id)
+    
+    def _begin(self, order_id: str, video_path: str, sink, issued: float, switched: bool):
+        """Record the new recording's state and report it"""
+        self.state = self.RECORDING
+        self.current_order = order_id
+        self._recording = {
+            "order_id": order_id,
+            "base_path": self.camera_manager.current_output_path,
+            "segment_sink": sink,
+            "started": time.monotonic()
+        }
+        self._awaiting_frame = (self.camera_manager.current_output_path, issued)
+        
+        # Files still under a standby name, for the recovery marker
+        renames = [self.camera_manager.pending_rename] if self.camera_manager.pending_rename else []
+        secondary_paths = []
+        if self.multi_camera is not None and self.multi_camera.enabled:
+            renames.extend(self.multi_camera.pending_renames())
+            secondary_paths = list(self.multi_camera.recording_paths.values())
+        
+        self._emit(self.STARTED, {
+            "order_id": order_id,
+            "video_path": video_path,
+            "base_path": self.camera_manager.current_output_path,
+            "segment_sink": sink,
+            "secondary_paths": secondary_paths,
+            "renames": renames,
+            "switched": switched,
+            "command_latency": round(time.monotonic() - issued, 4)
+        })
+    
+    def _start(self, order_id: str, issued: float):
+        """Start recording an order"""
+        sink = self._create_sink(order_id)
+        success, video_path = self.camera_manager.start_recording(
+            order_id,
+            segment_callback=sink.add if sink else None,
+            max_seconds=self.max_seconds
+        )
+        
+        if not success:
+            if sink is not None:
+                sink.finish()
+            self._emit(self.START_FAILED, {
+                "order_id": order_id,
+                "disk_space_low": self.camera_manager.disk_space_low
+            })
+            return
+        
+        # Same order and timestamp as the main file, suffixed _cam<index>
+        if self.multi_camera is not None and self.multi_camera.enabled:
+            self.multi_camera.start_recording(order_id)
+        
+        self._begin(order_id, video_path, sink, issued, switched=False)
+    
+    def _finished(
+        self,
+        video_path: Optional[str],
+        secondary_paths: list,
+        auto: bool,
+        next_order_id: Optional[str] = None
+    ):
+        """Report the end of the active recording"""
+        recording, self._recording = self._recording, None
+        self._awaiting_frame = None
+        self.state = self.IDLE
+        self.current_order = None
+        
+        if self.multi_camera is not None and self.multi_camera.enabled:
+            self.multi_camera.log_fps_report()
+        
+        self._emit(self.STOPPED, {
+            "order_id": recording["order_id"],
+            "video_path": video_path,
+            "base_path": recording["base_path"],
+            "segment_sink": recording["segment_sink"],
+            "secondary_paths": secondary_paths,
+            "crop": recording.get("crop"),
+            "duration": int(time.monotonic() - recording["started"]),
+            "auto": auto,
+            "next_order_id": next_order_id
+        })
+    
+    def _stop(self, auto: bool):
+        """Stop the active recording"""
+        self._recording["crop"] = self.camera_manager.get_recording_crop()
+        video_path = self.camera_manager.stop_recording()
+        
+        secondary_paths = []
+        if self.multi_camera is not None and self.multi_camera.enabled:
+            secondary_paths = self.multi_camera.stop_recording()
+        
+        self._finished(video_path, secondary_paths, auto)
+    
+    def _switch(self, order_id: str, issued: float):
+        """Hand the active recording over to another order"""
+        self._recording["crop"] = self.camera_manager.get_recording_crop()
+        sink = self._create_sink(order_id)
+        video_path, next_path = self.camera_manager.switch_recording(
+            order_id,
+            segment_callback=sink.add if sink else None,
+            max_seconds=self.max_seconds
+        )
+        
+        if next_path is None:
+            # Could not switch in place; stop and start (loses the reopen time)
+            if sink is not None:
+                sink.finish()
+            self._stop(auto=True)
+            self._start(order_id, issued)
+            return
+        
+        secondary_paths = []
+        if self.multi_camera is not None and self.multi_camera.enabled:
+            secondary_paths = self.multi_camera.switch_recording(order_id)
+        
+        self._finished(video_path, secondary_paths, auto=True, next_order_id=order_id)
+        self._begin(order_id, next_path, sink, issued, switched=True)
+    
+    def _on_frame(self, frame, capture_time: float):
+        """Frame listener: measure latency to the first frame of a new recording"""
+        awaiting = self._awaiting_frame
+        if awaiting is None or not self.camera_manager.is_recording:
+            return
+        
+        base_path, issued = awaiting
+        if self.camera_manager.current_output_path != base_path:
+            return
+        
+        self._awaiting_frame = None
+        # A frame captured just before the command can land in the new file
+        latency = max(0.0, capture_time - issued)
+        self.latencies.append(latency)
+        self.last_latency = latency
+        logger.info(f"Scan to first frame: {latency * 1000:.0f} ms")
+    
+    def _emit(self, event: str, info: dict):
+        """Send an event to the listener"""
+        if self.listener is None:
+            return
+        try:
+            self.listener(event, info)
+        except Exception as e:
+            logger.error(f"Recording session listener failed on {event}: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Headless run: hundreds of scans per second against a simulated camera,
+    # checking that every recording is reported started and stopped in order
+    import random
+    
+    class SimulatedCamera:
+        """Minimal stand-in with the CameraManager recording methods"""
+        
+        def __init__(self):
+            self.is_recording = False
+            self.current_output_path = None
+            self.disk_space_low = False
+            self.pending_rename = None
+            self.count = 0
+        
+        def _path(self, order_id):
+            self.count += 1
+            self.current_output_path = f"{order_id}_{self.count}.mp4"
+            return self.current_output_path
+        
+        def start_recording(self, order_id, segment_callback=None, max_seconds=None):
+            if self.is_recording:
+                return False, None
+            self.is_recording = True
+            return True, self._path(order_id)
+        
+        def switch_recording(self, order_id, segment_callback=None, max_seconds=None):
+            finished = self.current_output_path
+            return finished, self._path(order_id)
+        
+        def stop_recording(self):
+            self.is_recording = False
+            return self.current_output_path
+        
+        def get_recording_crop(self):
+            return None
+    
+    events = []
+    session = RecordingSession(SimulatedCamera(), listener=lambda event, info: events.append((event, info)))
+    
+    scans = 2000
+    start = time.monotonic()
+    for _ in range(scans):
+        session.scan(random.choice(["1001", "1002", "1003"]))
+    session.wait_idle()
+    elapsed = time.monotonic() - start
+    
+    # Every start is followed by exactly one stop of the same order
+    open_order = None
+    for event, info in events:
+        if event == RecordingSession.STARTED:
+            assert open_order is None, f"started {info['order_id']} while {open_order} open"
+            open_order = info["order_id"]
+        elif event == RecordingSession.STOPPED:
+            assert info["order_id"] == open_order, f"stopped {info['order_id']} while {open_order} open"
+            open_order = None
+    
+    assert open_order == session.current_order
+    session.shutdown()
+    print(f"{scans} scans in {elapsed:.3f}s ({scans / elapsed:.0f}/s), {len(events)} events, state consistent")
@@ -0,0 +1,335 @@
+"""
+Recovery Manager Module - Finds and repairs recordings left behind by a crash
+Each recording gets a pending marker next to its files that is removed once
+the upload succeeded; markers still present at startup identify orphans
+"""
+
+import json
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import yaml
+
+from .camera_manager import CameraManager
+from .logger import setup_logger
+from .post_processor import PostProcessor
+from .video_encoder import find_ffmpeg, subprocess_flags
+
+logger = setup_logger("RecoveryManager")
+
+
+class RecoveryManager:
+    """Tracks in-flight recordings and recovers orphaned ones"""
+    
+    MARKER_SUFFIX = ".pending.json"
+    UNRECOVERABLE_DIR = "unrecoverable"
+    
+    def __init__(self, config_path: Optional[str] = None):
+        """
+        Initialize Recovery Manager
+        
+        Args:
+            config_path: Path to config.yaml file
+        """
+        if config_path is None:
+            from .resource_path import get_resource_path
+            config_path = get_resource_path("config/config.yaml")
+        
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+        
+        from .resource_path import get_app_dir
+        self.temp_dir = get_app_dir() / self.config['storage']['local_temp_dir']
+        self.temp_dir.mkdir(exist_ok=True)
+        
+        self.ffmpeg_path = find_ffmpeg(self.config.get('ffmpeg', {}).get('path', ''))
+    
+    def _marker_path(self, recording_path: str) -> Path:
+        """Marker file of a recording (next to its files)"""
+        path = Path(recording_path)
+        return path.with_name(path.stem + self.MARKER_SUFFIX)
+    
+    def mark_pending(
+        self,
+        recording_path: str,
+        order_id: str,
+        username: Optional[str] = None,
+        user_id: Optional[str] = None,
+        renames: Optional[Sequence[Tuple[str, str]]] = None
+    ) -> bool:
+        """
+        Record that a recording has started and is not yet uploaded
+        
+        Args:
+            recording_path: Recording path without segment/camera suffix
+            order_id: Order ID
+            username: Username who made the recording
+            user_id: User ID
+            renames: (temporary file, final file) of files still being written
+                under a standby name (CameraManager.pending_rename)
+        
+        Returns:
+            True if the marker was written
+        """
+        marker = {
+            "order_id": order_id,
+            "recording": Path(recording_path).name,
+            "username": username,
+            "user_id": user_id,
+            "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if renames:
+            marker["renames"] = [[Path(source).name, Path(target).name] for source, target in renames]
+        
+        try:
+            with open(self._marker_path(recording_path), 'w', encoding='utf-8') as f:
+                json.dump(marker, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write recording marker: {e}")
+            return False
+    
+    def mark_uploaded(
+        self,
+        recording_path: str,
+        uploads: Dict[str, str],
+        video_url: Optional[str] = None,
+        metadata_saved: bool = False
+    ) -> bool:
+        """
+        Record files of a recording that are already uploaded
+        
+        Used when some files of a recording failed: recovery then only
+        uploads the rest, and does not save the metadata again.
+        
+        Args:
+            recording_path: Recording path without segment/camera suffix
+            uploads: Uploaded file (path or name) -> B2 URL
+            video_url: URL of the main recording once all of it is uploaded
+            metadata_saved: Metadata JSON for video_url was saved
+        
+        Returns:
+            True if the marker was updated
+        """
+        marker_path = self._marker_path(recording_path)
+        try:
+            with open(marker_path, 'r', encoding='utf-8') as f:
+                marker = json.load(f)
+            
+            marker.setdefault("uploaded", {}).update({Path(path).name: url for path, url in uploads.items()})
+            if video_url:
+                marker["video_url"] = video_url
+            if metadata_saved:
+                marker["metadata_saved"] = True
+            
+            with open(marker_path, 'w', encoding='utf-8') as f:
+                json.dump(marker, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update recording marker: {e}")
+            return False
+    
+    def mark_done(self, recording_path: str):
+        """
+        Remove the marker of a recording whose upload succeeded
+        
+        Args:
+            recording_path: Recording path without segment/camera suffix
+        """
+        try:
+            self._marker_path(recording_path).unlink(missing_ok=True)
+        except Exception as e:
+            logger.error(f"Failed to remove recording marker: {e}")
+    
+    def find_orphans(self) -> List[dict]:
+        """
+        Find recordings that were never uploaded (call before recording starts)
+        
+        Returns:
+            List of marker dictionaries with 'marker', 'recording_path',
+            'files' (main camera, in segment order) and 'camera_files'
+            (secondary cameras), both without files already uploaded, plus
+            'uploaded', 'video_url' and 'metadata_saved' from mark_uploaded()
+        """
+        orphans = []
+        
+        for marker_path in sorted(self.temp_dir.glob(f"*{self.MARKER_SUFFIX}")):
+            try:
+                with open(marker_path, 'r', encoding='utf-8') as f:
+                    orphan = json.load(f)
+            except Exception as e:
+                logger.error(f"Unreadable recording marker {marker_path.name}: {e}")
+                continue
+            
+            # Files interrupted while still under their standby name
+            for source, target in orphan.get('renames', []):
+                if (self.temp_dir / source).exists():
+                    (self.temp_dir / source).replace(self.temp_dir / target)
+                    logger.info(f"Restored name of interrupted recording: {target}")
+            
+            recording_path = self.temp_dir / orphan['recording']
+            stem, suffix = recording_path.stem, recording_path.suffix
+            
+            # Base file or _partNNN segments, plus _cam<index> files of this
+            # recording (not repair/post-processing intermediates or proxies)
+            uploaded = orphan.setdefault('uploaded', {})
+            files = sorted(
+                p for p in self.temp_dir.glob(f"{stem}*{suffix}")
+                if not p.stem.endswith((".repaired", PostProcessor.TEMP_SUFFIX, PostProcessor.PROXY_SUFFIX))
+                and p.name not in uploaded
+            )
+            
+            orphan.setdefault('video_url', None)
+            orphan.setdefault('metadata_saved', False)
+            orphan['marker'] = str(marker_path)
+            orphan['recording_path'] = str(recording_path)
+            orphan['files'] = [str(p) for p in files if "_cam" not in p.stem[len(stem):]]
+            orphan['camera_files'] = [str(p) for p in files if "_cam" in p.stem[len(stem):]]
+            orphans.append(orphan)
+        
+        # Standby writers no recording took over
+        for standby in self.temp_dir.glob(f"{CameraManager.STANDBY_PREFIX}*"):
+            try:
+                standby.unlink()
+            except OSError as e:
+                logger.warning(f"Could not delete unused standby file {standby.name}: {e}")
+        
+        if orphans:
+            logger.warning(f"Found {len(orphans)} recording(s) not uploaded before the last exit")
+        return orphans
+    
+    def is_playable(self, video_path: str) -> bool:
+        """
+        Check that a video file opens and has a decodable frame
+        
+        Args:
+            video_path: Video file
+        
+        Returns:
+            True if the file is playable
+        """
+        cap = cv2.VideoCapture(video_path)
+        try:
+            return cap.isOpened() and cap.read()[0]
+        finally:
+            cap.release()
+    
+    def get_duration(self, video_path: str) -> float:
+        """
+        Get video duration from its frame count
+        
+        Args:
+            video_path: Video file
+        
+        Returns:
+            Duration in seconds (0 if unknown)
+        """
+        cap = cv2.VideoCapture(video_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+            return frames / fps if fps > 0 and frames > 0 else 0.0
+        finally:
+            cap.release()
+    
+    def _remux(self, video_path: str) -> bool:
+        """Rewrite the file as a regular MP4 (drops a torn trailing fragment)"""
+        if not self.ffmpeg_path:
+            return False
+        
+        source = Path(video_path)
+        repaired = source.with_name(source.stem + ".repaired" + source.suffix)
+        command = [
+            self.ffmpeg_path,
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-i", str(source),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            str(repaired)
+        ]
+        
+        try:
+            result = subprocess.run(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=300,
+                creationflags=subprocess_flags()
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.error(f"Remux failed for {source.name}: {e}")
+            repaired.unlink(missing_ok=True)
+            return False
+        
+        if result.returncode != 0 or not self.is_playable(str(repaired)):
+            logger.warning(
+                f"Remux failed for {source.name}: "
+                f"{result.stderr.decode('utf-8', errors='ignore').strip()}"
+            )
+            repaired.unlink(missing_ok=True)
+            return False
+        
+        repaired.replace(source)
+        return True
+    
+    def repair(self, video_path: str) -> bool:
+        """
+        Make an interrupted recording playable
+        
+        Fragmented MP4 (ffmpeg.fragment_seconds) is readable up to the last
+        complete fragment and is remuxed into a regular MP4. A regular MP4
+        cut off before its index is written cannot be repaired.
+        
+        Args:
+            video_path: Video file
+        
+        Returns:
+            True if the file is playable
+        """
+        if self._remux(video_path):
+            logger.info(f"Repaired recording: {video_path}")
+            return True
+        
+        # No ffmpeg, or remux failed on a file that still plays
+        return self.is_playable(video_path)
+    
+    def set_aside(self, video_path: str):
+        """
+        Move an unrecoverable file out of the way so it is not retried
+        
+        Args:
+            video_path: Video file
+        """
+        target_dir = self.temp_dir / self.UNRECOVERABLE_DIR
+        target_dir.mkdir(exist_ok=True)
+        
+        try:
+            Path(video_path).replace(target_dir / Path(video_path).name)
+            logger.error(f"Unrecoverable recording moved to {target_dir}: {Path(video_path).name}")
+        except Exception as e:
+            logger.error(f"Failed to move unrecoverable recording {video_path}: {e}")
+    
+    def finish(self, orphan: dict):
+        """
+        Remove the marker of a recovered recording
+        
+        Args:
+            orphan: Entry from find_orphans()
+        """
+        try:
+            Path(orphan['marker']).unlink(missing_ok=True)
+        except Exception as e:
+            logger.error(f"Failed to remove recording marker: {e}")
+
+
+if __name__ == "__main__":
+    # List and repair orphaned recordings (no upload)
+    recovery = RecoveryManager()
+    
+    for orphan in recovery.find_orphans():
+        print(f"Order {orphan['order_id']} ({orphan['started']}):")
+        for path in orphan['files'] + orphan['camera_files']:
+            print(f"  {Path(path).name}: {'ok' if recovery.repair(path) else 'unrecoverable'}")
@@ -0,0 +1,181 @@
+"""
+Segment Uploader Module - Uploads recording segments while recording continues
+Finished segments are uploaded in order on a worker thread; a JSON manifest
+ties the segments of one recording to its order
+"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .logger import setup_logger
+
+logger = setup_logger("SegmentUploader")
+
+
+class SegmentUploader:
+    """Uploads the segments of one recording in the background"""
+    
+    def __init__(
+        self,
+        b2_uploader,
+        order_id: str,
+        wait_for_file: Callable[[str], bool],
+        cleanup: Optional[bool] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ):
+        """
+        Initialize uploader and start its worker thread
+        
+        Args:
+            b2_uploader: B2Uploader used for segment and manifest uploads
+            order_id: Order ID the segments belong to
+            wait_for_file: Blocks until a segment file is finalized
+                (CameraManager.wait_for_recording)
+            cleanup: Delete local segments after upload (None = config default)
+            progress_callback: Per-segment upload progress (bytes_sent, total_bytes)
+        """
+        self.b2_uploader = b2_uploader
+        self.order_id = order_id
+        self.wait_for_file = wait_for_file
+        self.cleanup = cleanup
+        self.progress_callback = progress_callback
+        
+        # One entry per segment, in recording order
+        self.segments: List[dict] = []
+        
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def add(self, path: str):
+        """
+        Queue a finished segment for upload (safe to call from any thread)
+        
+        Args:
+            path: Segment file path
+        """
+        self._queue.put(path)
+    
+    @property
+    def all_uploaded(self) -> bool:
+        """True if every queued segment has a B2 URL"""
+        return bool(self.segments) and all(segment['url'] for segment in self.segments)
+    
+    def finish(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for all queued segments to upload
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        
+        Returns:
+            True if every segment was uploaded
+        """
+        start = time.monotonic()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        
+        if self._thread.is_alive():
+            logger.warning(f"Segment uploads still running for order {self.order_id}")
+            return False
+        
+        logger.info(
+            f"Segments for order {self.order_id} done {time.monotonic() - start:.1f}s after stop "
+            f"({sum(1 for s in self.segments if s['url'])}/{len(self.segments)} uploaded)"
+        )
+        return self.all_uploaded
+    
+    @staticmethod
+    def manifest_path(recording_path: str) -> str:
+        """
+        Get local manifest path for a recording
+        
+        Args:
+            recording_path: Recording path without segment suffix
+        
+        Returns:
+            Path of the manifest JSON next to the segments
+        """
+        base = Path(recording_path)
+        return str(base.with_name(f"{base.stem}_manifest.json"))
+    
+    def upload_manifest(self, manifest_path: str, fps: float, segment_seconds: float) -> Optional[str]:
+        """
+        Write and upload the manifest listing all segments of the recording
+        Call after finish()
+        
+        Args:
+            manifest_path: Local path for the manifest JSON
+            fps: Recording frame rate
+            segment_seconds: Configured segment length
+        
+        Returns:
+            Public URL of the manifest or None if failed
+        """
+        manifest = {
+            "order_id": self.order_id,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "fps": fps,
+            "segment_seconds": segment_seconds,
+            "complete": self.all_uploaded,
+            "segments": self.segments
+        }
+        
+        try:
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"Error writing segment manifest: {str(e)}")
+            return None
+        
+        # Uploaded as JSON (json/ prefix, application/json), not as a video
+        url = self.b2_uploader.upload_json_metadata(manifest_path, self.order_id)
+        if url:
+            logger.info(f"Segment manifest uploaded: {url}")
+            
+            cleanup = self.b2_uploader.config['storage']['auto_delete_after_upload']
+            if self.cleanup is not None:
+                cleanup = self.cleanup
+            if cleanup:
+                self.b2_uploader.delete_local_file(manifest_path)
+        return url
+    
+    def _run(self):
+        """Worker thread loop uploading segments in order"""
+        while True:
+            path = self._queue.get()
+            if path is None:
+                break
+            self._upload_segment(path)
+    
+    def _upload_segment(self, path: str):
+        """Wait for a segment to be finalized and upload it"""
+        segment = {
+            "index": len(self.segments) + 1,
+            "file": Path(path).name,
+            "url": None,
+            "bytes": 0
+        }
+        self.segments.append(segment)
+        
+        try:
+            if not self.wait_for_file(path):
+                logger.error(f"Segment not finalized: {path}")
+                return
+            
+            segment["bytes"] = Path(path).stat().st_size
+            segment["url"] = self.b2_uploader.upload_with_cleanup(
+                path,
+                self.order_id,
+                self.progress_callback,
+                cleanup_override=self.cleanup
+            )
+            if not segment["url"]:
+                logger.error(f"Failed to upload segment: {path}")
+        except Exception as e:
+            logger.error(f"Error uploading segment {path}: {str(e)}")
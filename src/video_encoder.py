@@ -0,0 +1,587 @@
+"""
+Video Encoder Module - Asynchronous video encoding
+Feeds a video writer from a bounded frame queue on a worker thread
+Supports OpenCV VideoWriter (default) or an ffmpeg process fed through a pipe
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_pool import FramePool
+from .logger import setup_logger
+
+logger = setup_logger("VideoEncoder")
+
+
+def find_ffmpeg(configured_path: str = "") -> Optional[str]:
+    """
+    Locate the ffmpeg executable
+    
+    Args:
+        configured_path: Explicit path from config (empty to search)
+        
+    Returns:
+        Path to ffmpeg or None if not available
+    """
+    if configured_path:
+        return configured_path if Path(configured_path).exists() else None
+    
+    # Bundled next to the app first, then PATH
+    from .resource_path import get_app_dir
+    for name in ("ffmpeg.exe", "ffmpeg"):
+        candidate = get_app_dir() / name
+        if candidate.exists():
+            return str(candidate)
+    
+    return shutil.which("ffmpeg")
+
+
+def subprocess_flags() -> int:
+    """Creation flags that keep ffmpeg from opening a console window on Windows"""
+    return getattr(subprocess, "CREATE_NO_WINDOW", 0) if os.name == "nt" else 0
+
+
+class WriteBehindFile:
+    """Stages output bytes in memory and writes them on an I/O thread
+    
+    Disk stalls only hold up the I/O thread; the producer keeps going until
+    the staging buffer is full. Writes are batched into large sequential
+    writes instead of one per encoded packet.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        max_buffer_bytes: int,
+        write_size: int = 4 * 1024 * 1024,
+        max_delay: float = 0.5
+    ):
+        """
+        Open the file and start the I/O thread
+        
+        Args:
+            path: Output file
+            max_buffer_bytes: Staging limit; feed() blocks when exceeded
+            write_size: Target size of one write
+            max_delay: Longest time bytes wait for a batch to fill (bounds
+                what a crash can lose from the buffer)
+        """
+        self.path = path
+        self.max_buffer_bytes = max(write_size, max_buffer_bytes)
+        self.write_size = write_size
+        self.max_delay = max_delay
+        
+        # Counters
+        self.bytes_written = 0
+        self.writes = 0
+        self.peak_buffered = 0
+        self.producer_wait = 0.0  # Seconds feed() waited for a full buffer
+        self.failed = False
+        
+        self._file = open(path, "wb")
+        self._chunks: deque = deque()
+        self._buffered = 0
+        self._oldest_time = 0.0  # When the oldest staged chunk arrived
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def feed(self, data: bytes):
+        """
+        Stage bytes for writing
+        
+        Args:
+            data: Bytes to append to the file
+        """
+        with self._condition:
+            if self._buffered >= self.max_buffer_bytes:
+                start = time.monotonic()
+                while self._buffered >= self.max_buffer_bytes and not self.failed:
+                    self._condition.wait()
+                self.producer_wait += time.monotonic() - start
+            
+            if not self._chunks:
+                self._oldest_time = time.monotonic()
+            self._chunks.append(data)
+            self._buffered += len(data)
+            self.peak_buffered = max(self.peak_buffered, self._buffered)
+            self._condition.notify_all()
+    
+    def close(self):
+        """Write all staged bytes and close the file"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+    
+    def _run(self):
+        """I/O thread loop"""
+        while True:
+            with self._condition:
+                # Wait for a full batch, the delay limit, or close
+                while not self._closed:
+                    if self._buffered >= self.write_size:
+                        break
+                    if self._chunks:
+                        remaining = self._oldest_time + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if not self._chunks:
+                    break
+                
+                # Take up to write_size bytes (at least one chunk)
+                batch = [self._chunks.popleft()]
+                size = len(batch[0])
+                while self._chunks and size + len(self._chunks[0]) <= self.write_size:
+                    chunk = self._chunks.popleft()
+                    batch.append(chunk)
+                    size += len(chunk)
+                self._oldest_time = time.monotonic()
+            
+            if not self.failed:
+                try:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    self.bytes_written += size
+                    self.writes += 1
+                except OSError as e:
+                    # Keep draining so the producer never blocks forever
+                    self.failed = True
+                    logger.error(f"Write failed for {self.path}: {str(e)}")
+            
+            with self._condition:
+                self._buffered -= size
+                self._condition.notify_all()
+        
+        try:
+            self._file.close()
+        except OSError as e:
+            self.failed = True
+            logger.error(f"Failed to close {self.path}: {str(e)}")
+
+
+class FFmpegPipeWriter:
+    """Encodes raw BGR frames by piping them to an ffmpeg process
+    
+    Mirrors the cv2.VideoWriter interface (write, release, isOpened) so it
+    can be used anywhere a VideoWriter is expected.
+    """
+    
+    def __init__(
+        self,
+        output_path: str,
+        fps: float,
+        frame_size: Tuple[int, int],
+        ffmpeg_path: str,
+        codec: str = "libx264",
+        preset: str = "veryfast",
+        crf: int = 26,
+        fragment_seconds: float = 0,
+        write_behind_bytes: int = 0
+    ):
+        """
+        Start ffmpeg reading raw frames from stdin
+        
+        Args:
+            output_path: Output video file
+            fps: Frame rate of the input frames
+            frame_size: Frame (width, height)
+            ffmpeg_path: Path to ffmpeg executable
+            codec: ffmpeg video codec
+            preset: Encoder speed preset (slower = smaller files, more CPU)
+            crf: Constant rate factor (higher = smaller files, lower quality)
+            fragment_seconds: Write a fragmented MP4 with a fragment (and
+                keyframe) every N seconds, so a crash or power loss only loses
+                the last fragment (0 = regular MP4, unplayable until finished)
+            write_behind_bytes: Read ffmpeg's output through a pipe and write
+                it via a WriteBehindFile of this size (needs fragment_seconds,
+                a regular MP4 cannot be streamed; 0 = ffmpeg writes the file)
+        """
+        self.output_path = output_path
+        width, height = frame_size
+        self.command = [
+            ffmpeg_path,
+            "-hide_banner", "-loglevel", "error", "-nostats", "-y",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}",
+            "-framerate", str(fps),
+            "-i", "-",
+            "-an",
+            "-c:v", codec,
+            "-preset", str(preset),
+            "-crf", str(crf),
+            "-pix_fmt", "yuv420p"
+        ]
+        if fragment_seconds > 0:
+            # Index (moov) up front, then self-contained fragments per keyframe,
+            # each flushed to disk as soon as it is complete
+            self.command += [
+                "-g", str(max(1, int(round(fps * fragment_seconds)))),
+                "-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+                "-flush_packets", "1"
+            ]
+        
+        # Streamed to stdout and written by our I/O thread, or written by ffmpeg
+        write_behind = write_behind_bytes > 0 and fragment_seconds > 0
+        self.command += ["-f", "mp4", "pipe:1"] if write_behind else [output_path]
+        self._failed = False
+        self._sink: Optional[WriteBehindFile] = None
+        self._pump: Optional[threading.Thread] = None
+        
+        try:
+            if write_behind:
+                self._sink = WriteBehindFile(output_path, write_behind_bytes)
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE if write_behind else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                creationflags=subprocess_flags()
+            )
+        except OSError as e:
+            logger.error(f"Failed to start ffmpeg: {str(e)}")
+            self._process = None
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+            return
+        
+        if self._sink is not None:
+            self._pump = threading.Thread(target=self._pump_output, daemon=True)
+            self._pump.start()
+    
+    def _pump_output(self):
+        """Move ffmpeg's output into the write-behind buffer as it arrives"""
+        stdout = self._process.stdout
+        while True:
+            data = stdout.read1(1024 * 1024)
+            if not data:
+                break
+            self._sink.feed(data)
+    
+    def isOpened(self) -> bool:
+        """Check that ffmpeg is running and accepting frames"""
+        if self._sink is not None and self._sink.failed:
+            return False
+        return self._process is not None and self._process.poll() is None and not self._failed
+    
+    def write(self, frame: np.ndarray):
+        """
+        Send one frame to ffmpeg
+        
+        Args:
+            frame: BGR frame of the configured size
+        """
+        if self._process is None or self._failed:
+            return
+        
+        try:
+            self._process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError) as e:
+            # ffmpeg exited; error details are logged on release()
+            self._failed = True
+            logger.error(f"ffmpeg pipe closed: {str(e)}")
+    
+    def release(self):
+        """Finish encoding and wait for ffmpeg to write the file"""
+        if self._process is None:
+            return
+        
+        process = self._process
+        self._process = None
+        
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        
+        stderr = process.stderr.read().decode("utf-8", errors="ignore").strip()
+        returncode = process.wait()
+        process.stderr.close()
+        
+        if self._sink is not None:
+            # Output pipe hits EOF once ffmpeg exits; then drain staged bytes
+            self._pump.join()
+            process.stdout.close()
+            self._sink.close()
+            sink = self._sink
+            logger.info(
+                f"Write-behind: {sink.bytes_written / 1024 / 1024:.1f} MB in {sink.writes} writes, "
+                f"peak buffer {sink.peak_buffered / 1024 / 1024:.1f} MB, "
+                f"encoder waited {sink.producer_wait:.2f}s"
+            )
+            if sink.failed:
+                logger.error(f"Write-behind failed, recording may be incomplete: {self.output_path}")
+        
+        if returncode != 0:
+            logger.error(f"ffmpeg exited with code {returncode}: {stderr}")
+        elif stderr:
+            logger.warning(f"ffmpeg: {stderr}")
+
+
+def create_video_writer(output_path: str, fps: float, frame_size: Tuple[int, int], config: dict):
+    """
+    Create the configured video writer backend
+    
+    Args:
+        output_path: Output video file
+        fps: Recording frame rate
+        frame_size: Frame (width, height)
+        config: Full app configuration
+        
+    Returns:
+        cv2.VideoWriter or FFmpegPipeWriter (check isOpened())
+    """
+    camera_config = config['camera']
+    ffmpeg_config = config.get('ffmpeg', {})
+    
+    if camera_config.get('encoder', 'opencv') == 'ffmpeg':
+        ffmpeg_path = find_ffmpeg(ffmpeg_config.get('path', ''))
+        if ffmpeg_path:
+            logger.info(f"Encoding with ffmpeg ({ffmpeg_config.get('codec', 'libx264')}, "
+                        f"preset {ffmpeg_config.get('preset', 'veryfast')}, crf {ffmpeg_config.get('crf', 26)})")
+            return FFmpegPipeWriter(
+                output_path,
+                fps,
+                frame_size,
+                ffmpeg_path,
+                codec=ffmpeg_config.get('codec', 'libx264'),
+                preset=ffmpeg_config.get('preset', 'veryfast'),
+                crf=ffmpeg_config.get('crf', 26),
+                fragment_seconds=float(ffmpeg_config.get('fragment_seconds', 0)),
+                write_behind_bytes=int(ffmpeg_config.get('write_behind_mb', 0) * 1024 * 1024)
+            )
+        logger.warning("ffmpeg encoder selected but ffmpeg was not found - using OpenCV")
+    
+    fourcc = cv2.VideoWriter_fourcc(*camera_config['codec'])
+    return cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+
+
+class AsyncEncoder:
+    """Encodes frames on a worker thread behind a bounded queue"""
+    
+    # Backpressure policies when the queue is full
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+    POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+    
+    def __init__(
+        self,
+        writer,
+        frame_size: Tuple[int, int],
+        queue_size: int = 30,
+        policy: str = DROP_OLDEST,
+        block_timeout: float = 1.0,
+        preload: Optional[List[bytes]] = None,
+        pool: Optional[FramePool] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None
+    ):
+        """
+        Initialize encoder and start its worker thread
+        
+        Args:
+            writer: Opened cv2.VideoWriter or FFmpegPipeWriter (released by the worker)
+            frame_size: Output (width, height); frames are resized if needed
+            queue_size: Maximum number of frames waiting to be encoded
+            policy: Backpressure policy ('drop_oldest', 'drop_newest', 'block')
+            block_timeout: Seconds to wait for space with the 'block' policy
+            preload: JPEG-encoded frames written before any queued frame
+                (e.g. pre-roll); decoded on the worker, not subject to the queue limit
+            pool: Buffer pool for queued frame copies (None allocates per frame)
+            crop: (x, y, width, height) cut from every frame before it is
+                queued, so only the cropped pixels are copied and encoded
+        """
+        if policy not in self.POLICIES:
+            logger.warning(f"Unknown backpressure policy '{policy}', using {self.DROP_OLDEST}")
+            policy = self.DROP_OLDEST
+        
+        self.writer = writer
+        self.frame_size = frame_size
+        self.policy = policy
+        self.block_timeout = block_timeout
+        
+        # Counters
+        self.frames_submitted = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.write_errors = 0
+        
+        self._preload = preload or []
+        self._pool = pool
+        self.crop = crop
+        
+        # (source, target): file renamed after the writer is released
+        # (standby writers are opened before the file name is known)
+        self.rename_to: Optional[Tuple[str, str]] = None
+        self._resize_buffer: Optional[np.ndarray] = None
+        self._queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of frames waiting to be encoded"""
+        return self._queue.qsize()
+    
+    def submit(self, frame: np.ndarray) -> bool:
+        """
+        Queue a frame for encoding without waiting on the encoder
+        
+        Args:
+            frame: Frame to encode (copied, caller may reuse the buffer)
+        
+        Returns:
+            True if the frame was queued, False if it was dropped
+        """
+        if self._closed:
+            return False
+        
+        self.frames_submitted += 1
+        frame = self._crop(frame)
+        frame = self._pool.copy(frame) if self._pool is not None else frame.copy()
+        
+        if self.policy == self.BLOCK:
+            try:
+                self._queue.put(frame, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                self._drop(frame)
+                return False
+        
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            pass
+        
+        if self.policy == self.DROP_NEWEST:
+            self._drop(frame)
+            return False
+        
+        # Drop oldest: make room by discarding the frame at the head
+        try:
+            oldest = self._queue.get_nowait()
+            if oldest is not None:
+                self._drop(oldest)
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self._drop(frame)
+            return False
+    
+    def _crop(self, frame: np.ndarray) -> np.ndarray:
+        """View of the crop region (the whole frame if no crop is set)"""
+        if self.crop is None:
+            return frame
+        x, y, width, height = self.crop
+        return frame[y:y + height, x:x + width]
+    
+    def _drop(self, frame: np.ndarray):
+        """Count a dropped frame and recycle its buffer"""
+        self.frames_dropped += 1
+        if self._pool is not None:
+            self._pool.release(frame)
+    
+    def close(self):
+        """Stop accepting frames; the worker drains the queue and releases the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        # Sentinel always goes in after the queued frames
+        self._queue.put(None)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the worker to finish writing all queued frames
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        
+        Returns:
+            True if the file has been finalized
+        """
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+    
+    def get_stats(self) -> dict:
+        """Get encoder counters"""
+        return {
+            "frames_submitted": self.frames_submitted,
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "write_errors": self.write_errors,
+            "queue_depth": self.queue_depth
+        }
+    
+    def _run(self):
+        """Worker thread loop writing queued frames"""
+        logger.debug("Encoder worker started")
+        
+        # Preloaded frames go first, in order
+        preload, self._preload = self._preload, []
+        for encoded in preload:
+            frame = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                self.write_errors += 1
+                continue
+            self._write(self._crop(frame))
+        
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            self._write(frame)
+            if self._pool is not None:
+                self._pool.release(frame)
+        
+        try:
+            self.writer.release()
+        except Exception as e:
+            logger.error(f"Error releasing video writer: {str(e)}")
+        
+        if self.rename_to is not None:
+            source, target = self.rename_to
+            try:
+                os.replace(source, target)
+            except OSError as e:
+                logger.error(f"Failed to rename {source} to {target}: {str(e)}")
+        
+        logger.debug("Encoder worker finished")
+    
+    def _write(self, frame: np.ndarray):
+        """Resize (if needed) and write one frame"""
+        target_w, target_h = self.frame_size
+        
+        try:
+            # Resize frame to recording resolution if needed
+            h, w = frame.shape[:2]
+            if w != target_w or h != target_h:
+                # Resized into one reused buffer (writer copies the frame)
+                frame = cv2.resize(frame, (target_w, target_h), dst=self._resize_buffer)
+                self._resize_buffer = frame
+            
+            self.writer.write(frame)
+            self.frames_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"Error writing frame: {str(e)}")
@@ -0,0 +1,249 @@
+"""
+Vision Scanner Module - Reads order QR codes from the camera image
+Alternative to the serial barcode scanner: frames from the capture path are
+downscaled and decoded with cv2.QRCodeDetector on a worker thread, at a rate
+kept within a small CPU budget
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+import yaml
+
+from .logger import setup_logger
+
+logger = setup_logger("VisionScanner")
+
+
+class VisionScanner:
+    """Decodes QR codes shown to the camera and reports parsed order IDs"""
+    
+    def __init__(
+        self,
+        camera_manager,
+        parse_order_id: Callable[[str], Optional[str]],
+        config_path: Optional[str] = None
+    ):
+        """
+        Initialize Vision Scanner
+        
+        Args:
+            camera_manager: CameraManager (frames via frame listener) or
+                CameraProcessClient (frames polled from the preview)
+            parse_order_id: Parser for decoded text (ScannerManager.parse_order_id)
+            config_path: Path to config.yaml file
+        """
+        if config_path is None:
+            from .resource_path import get_resource_path
+            config_path = get_resource_path("config/config.yaml")
+        
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+        
+        scanner_config = self.config['scanner']
+        self.enabled = bool(scanner_config.get('vision_enabled', False))
+        self.min_interval = float(scanner_config.get('vision_interval_seconds', 0.5))
+        self.cpu_budget = float(scanner_config.get('vision_cpu_budget', 0.03))
+        self.scan_width = int(scanner_config.get('vision_width', 800))
+        self.cooldown_seconds = float(scanner_config.get('vision_cooldown_seconds', 3))
+        
+        self.camera_manager = camera_manager
+        self.parse_order_id = parse_order_id
+        self.callback: Optional[Callable[[str], None]] = None
+        self.is_running = False
+        
+        # Counters
+        self.frames_scanned = 0
+        self.codes_reported = 0
+        self.decode_seconds = 0.0
+        
+        self._detector = cv2.QRCodeDetector()
+        self._thread: Optional[threading.Thread] = None
+        self._frame_ready = threading.Event()
+        self._scan_buffer: Optional[np.ndarray] = None  # Grayscale, downscaled frame
+        self._busy = False  # Worker is decoding; listener skips frames
+        self._next_scan = 0.0  # time.monotonic() before which frames are skipped
+        self._started_at = 0.0
+        
+        # Text of the code in view and when it was last seen (repeat suppression)
+        self._last_text: Optional[str] = None
+        self._last_seen = 0.0
+    
+    def start(self, callback: Callable[[str], None]) -> bool:
+        """
+        Start scanning camera frames
+        
+        Args:
+            callback: Function called (on the scanner thread) with each parsed order ID
+        
+        Returns:
+            True if scanning started
+        """
+        if not self.enabled:
+            return False
+        
+        if self.is_running:
+            logger.warning("Vision scanner already running")
+            return True
+        
+        self.callback = callback
+        self.is_running = True
+        self._started_at = time.monotonic()
+        
+        if hasattr(self.camera_manager, 'add_frame_listener'):
+            self.camera_manager.add_frame_listener(self._on_frame)
+            target = self._listener_loop
+        else:
+            # Capture runs in another process; decode the shared preview instead
+            target = self._poll_loop
+        
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        
+        logger.info(
+            f"Vision scanner started ({self.scan_width}px, every {self.min_interval}s, "
+            f"CPU budget {self.cpu_budget:.0%})"
+        )
+        return True
+    
+    def stop(self):
+        """Stop scanning and log the achieved cost"""
+        if not self.is_running:
+            return
+        
+        self.is_running = False
+        if hasattr(self.camera_manager, 'remove_frame_listener'):
+            self.camera_manager.remove_frame_listener(self._on_frame)
+        self._frame_ready.set()
+        
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        
+        stats = self.get_stats()
+        logger.info(
+            f"Vision scanner stopped: {stats['frames_scanned']} frames, "
+            f"{stats['avg_decode_ms']} ms/decode, {stats['cpu_share']:.1%} of one core"
+        )
+    
+    def _on_frame(self, frame: np.ndarray, capture_time: float):
+        """Frame listener (capture thread): downscale a frame when a scan is due"""
+        if self._busy or capture_time < self._next_scan:
+            return
+        
+        self._scan_buffer = self._downscale(frame)
+        self._busy = True
+        self._frame_ready.set()
+    
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        """Grayscale copy of the frame at scan width (never upscaled)"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+        if width <= self.scan_width:
+            return gray
+        
+        scale = self.scan_width / width
+        return cv2.resize(gray, (self.scan_width, round(height * scale)), interpolation=cv2.INTER_AREA)
+    
+    def _listener_loop(self):
+        """Worker thread decoding frames handed over by the frame listener"""
+        while self.is_running:
+            if not self._frame_ready.wait(timeout=1.0):
+                continue
+            self._frame_ready.clear()
+            
+            if self.is_running and self._scan_buffer is not None:
+                self._scan(self._scan_buffer)
+            self._busy = False
+    
+    def _poll_loop(self):
+        """Worker thread decoding the preview frame (process-isolated capture)"""
+        while self.is_running:
+            delay = self._next_scan - time.monotonic()
+            if delay > 0:
+                time.sleep(min(delay, 0.5))
+                continue
+            
+            # Own copy: the shared preview buffer belongs to the Tk thread
+            frame = self.camera_manager.get_preview_frame(copy=True)
+            if frame is None:
+                self._next_scan = time.monotonic() + self.min_interval
+                continue
+            
+            # Preview is mirrored when flip is on; QR codes only decode unmirrored
+            if self.camera_manager.flip_horizontal:
+                frame = cv2.flip(frame, 1)
+            self._scan(self._downscale(frame))
+    
+    def _scan(self, image: np.ndarray):
+        """Decode one image and schedule the next scan within the CPU budget"""
+        start = time.monotonic()
+        try:
+            text, _, _ = self._detector.detectAndDecode(image)
+        except cv2.error as e:
+            logger.debug(f"QR decode failed: {e}")
+            text = ""
+        elapsed = time.monotonic() - start
+        
+        self.frames_scanned += 1
+        self.decode_seconds += elapsed
+        
+        # Slow decodes (large frames, weak CPU) stretch the interval
+        wait = max(self.min_interval, elapsed / self.cpu_budget if self.cpu_budget > 0 else 0.0)
+        self._next_scan = start + wait
+        
+        if text:
+            self._handle_text(text, start)
+    
+    def _handle_text(self, text: str, seen_at: float):
+        """Report a decoded code unless it is the same code still in view"""
+        repeat = text == self._last_text and seen_at - self._last_seen < self.cooldown_seconds
+        self._last_text = text
+        self._last_seen = seen_at
+        
+        # A code held in front of the camera must not toggle recording;
+        # it is reported again only after being out of view for the cooldown
+        if repeat:
+            return
+        
+        logger.debug(f"Vision scanned: {text}")
+        order_id = self.parse_order_id(text)
+        if order_id and self.callback:
+            self.codes_reported += 1
+            self.callback(order_id)
+    
+    def get_stats(self) -> dict:
+        """
+        Get scanning statistics
+        
+        Returns:
+            Dictionary with frames_scanned, codes_reported, avg_decode_ms and
+            cpu_share (decode time / running time, one core)
+        """
+        running = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "frames_scanned": self.frames_scanned,
+            "codes_reported": self.codes_reported,
+            "avg_decode_ms": round(self.decode_seconds / self.frames_scanned * 1000, 1) if self.frames_scanned else 0.0,
+            "cpu_share": self.decode_seconds / running if running > 0 else 0.0
+        }
+
+
+if __name__ == "__main__":
+    # Show a QR code to the camera for 30 seconds
+    from .camera_manager import CameraManager
+    from .scanner_manager import ScannerManager
+    
+    camera = CameraManager()
+    scanner = VisionScanner(camera, ScannerManager().parse_order_id)
+    scanner.enabled = True
+    
+    if camera.start_camera(0):
+        scanner.start(lambda order_id: print(f"Scanned: {order_id}"))
+        time.sleep(30)
+        scanner.stop()
+        print(scanner.get_stats())
+        camera.stop_camera()